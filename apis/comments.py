@@ -3,9 +3,13 @@ from models.comment import Comment
 from models.user import User
 from models.notification import Notification
 from models.recipe import Recipe
+from models.user_stats import UserStats
 from utils.jwt_utils import token_required
 from utils.crud_factory import crud_factory
 from utils.crud_utils import get_document_or_404, update_document_fields
+from utils.notification_queue import notification_queue
+from utils.refs import ref_id
+from utils.response_cache import response_cache
 
 comments_bp = Blueprint("comments", __name__)
 
@@ -15,7 +19,18 @@ def require_token():
     # This ensures token_required runs before every request to this blueprint
     pass
 
-crud_factory(comments_bp, Comment, "comments",[ "body", "recipe"], user_owned = True, exclude_methods=["POST"] )
+def forget_comment(comment):
+    """Take a comment that is about to be deleted out of UserStats and its recipe's commentCount."""
+    recipe_id = ref_id(comment, "recipe")
+    UserStats.bump(ref_id(comment, "user"), commentCount=-1)
+    Recipe.objects(id=recipe_id).update_one(dec__commentCount=1)
+    response_cache.invalidate(recipe_id)
+
+
+crud_factory(
+    comments_bp, Comment, "comments", ["body", "recipe"], user_owned = True, exclude_methods=["POST"],
+    on_delete=forget_comment
+)
 
 @comments_bp.route("/comments", methods=["POST"])
 def create_comment():
@@ -34,16 +49,25 @@ def create_comment():
     user = User.objects(id=request.user_id).first()
 
     comment = Comment(user=user, recipe=recipe, body=body).save()
+    UserStats.bump(user.id, commentCount=1)
+    Recipe.objects(id=recipe.id).update_one(inc__commentCount=1)
+    response_cache.invalidate(recipe.id)
 
-    if str(recipe.user.id) != str(user.id):
-        Notification(
-            user=recipe.user,
-            actor=user,
-            recipe=recipe,
-            comment=comment,
-            type="comment",
-            message=f"{user.username} commented on your recipe '{recipe.title}'"
-        ).save()
+    owner_id = ref_id(recipe, "user")
+    if str(owner_id) != str(user.id):
+        # Written by the background queue, off the request path
+        notification_queue.enqueue_create(
+            ("comment", str(comment.id)),
+            Notification(
+                user=owner_id,
+                actor=user,
+                recipe=recipe,
+                comment=comment,
+                type="comment",
+                message=f"{user.username} commented on your recipe '{recipe.title}'"
+            ),
+            actor=user
+        )
 
     return jsonify(comment.to_dict()), 201
 
@@ -0,0 +1,43 @@
+from flask import Blueprint, jsonify
+from utils.health import health_monitor
+from utils.notification_queue import notification_queue
+
+health_bp = Blueprint("health", __name__)
+
+# All three answer from health_monitor's last background check and never touch MongoDB themselves
+
+
+@health_bp.before_app_request
+def start_health_monitor():
+    health_monitor.start()
+
+
+#___________
+#Liveness: the process is up and serving requests
+#___________
+@health_bp.route("/health/live", methods=["GET"])
+def liveness():
+    return jsonify({"status": "ok"}), 200
+
+
+#___________
+#Readiness: MongoDB answered a ping within HEALTH_STALE_AFTER_SECONDS
+#___________
+@health_bp.route("/health/ready", methods=["GET"])
+def readiness():
+    state = health_monitor.state()
+    ready = health_monitor.is_ready()
+    return jsonify({
+        "status": "ok" if ready else state["status"],
+        "last_success": state["database"]["last_success"]
+    }), 200 if ready else 503
+
+
+#___________
+#Full health detail
+#___________
+@health_bp.route("/health", methods=["GET"])
+def health():
+    state = health_monitor.state()
+    state["notification_queue"] = notification_queue.stats()
+    return jsonify(state), 200 if health_monitor.is_ready() else 503
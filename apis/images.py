@@ -1,24 +1,93 @@
-from flask import Blueprint, jsonify, send_file
-from mongoengine import get_db
+from flask import Blueprint, jsonify, request, Response
 from bson import ObjectId
-from gridfs import GridFS
-import io
+import logging
+from utils.images import pick_variant_width, find_variant
+from utils.metrics import GRIDFS_BYTES_SERVED
+from utils.db import get_fs
+
+logger = logging.getLogger(__name__)
 
 images_bp = Blueprint("images", __name__)
 
+# GridFS files are never modified in place (a new upload gets a new id), so
+# clients may cache them for as long as they like
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+STREAM_CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+
+
+def _stream_file(file, start, stop):
+    """Yield [start, stop) of a GridOut chunk by chunk without buffering the whole file."""
+    try:
+        file.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            GRIDFS_BYTES_SERVED.inc(len(chunk))
+            yield chunk
+    finally:
+        file.close()
+
 
 @images_bp.route("/api/images/<image_id>")
 def serve_image(image_id):
     try:
-        db = get_db()
-        fs = GridFS(db)
-        
+        fs = get_fs()
         file = fs.get(ObjectId(image_id))
-
-        image_stream = io.BytesIO(file.read())
-
-        return send_file(image_stream, mimetype=file.content_type, download_name=f"{image_id}.jpg")
     except Exception as e:
-        print(f"[ERROR] Failed to fetch {image_id} : {e}")
+        logger.warning("Failed to fetch image %s: %s", image_id, e)
         return jsonify({"error": "Image not found", "details": str(e)}), 404
-    
\ No newline at end of file
+
+    # ?w=<px> serves the smallest stored variant at least that wide, falling back to the original
+    requested_width = request.args.get("w", type=int)
+    variant_width = pick_variant_width(requested_width) if requested_width else None
+    if variant_width:
+        accept_webp = "image/webp" in request.headers.get("Accept", "")
+        variant = find_variant(fs, file._id, variant_width, accept_webp=accept_webp)
+        if variant:
+            file.close()
+            file = variant
+
+    etag = file.md5 or str(file._id)
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if requested_width:
+        headers["Vary"] = "Accept"
+
+    if request.if_none_match.contains(etag):
+        file.close()
+        return Response(status=304, headers=headers)
+
+    length = file.length
+    start, stop, status = 0, length, 200
+
+    # Honour Range only for a single range, and only if If-Range (when sent) still matches
+    byte_range = request.range
+    if byte_range and len(byte_range.ranges) == 1 and (
+        not request.if_range.etag or request.if_range.etag == etag
+    ):
+        bounds = byte_range.range_for_length(length)
+        if bounds is None:
+            file.close()
+            headers["Content-Range"] = f"bytes */{length}"
+            return Response(status=416, headers=headers)
+
+        start, stop = bounds
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{length}"
+
+    headers["Content-Length"] = str(stop - start)
+    headers["Content-Disposition"] = f'inline; filename="{image_id}.jpg"'
+
+    return Response(
+        _stream_file(file, start, stop),
+        status=status,
+        mimetype=file.content_type or "image/jpeg",
+        headers=headers,
+        direct_passthrough=True,
+    )
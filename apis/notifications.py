@@ -1,19 +1,39 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
 from models.notification import Notification
 from models.user import User
-from utils.jwt_utils import token_required
+from utils.jwt_utils import token_required, decode_token, create_scoped_token
+from utils.revocation import revocation_cache
 from utils.crud_factory import crud_factory
 from utils.crud_utils import get_document_or_404, update_document_fields
+from utils.notification_stream import notification_pubsub
+from bson import ObjectId
+import datetime
+import json
+import queue
+import time
+
+# Comment line sent when idle so proxies keep the connection open and dead clients are noticed
+STREAM_HEARTBEAT_SECONDS = 15
+# Lifetime of the ?token= a browser EventSource connects with (it cannot send an Authorization header)
+STREAM_TOKEN_LIFETIME = datetime.timedelta(seconds=60)
+STREAM_TOKEN_SCOPE = "notification-stream"
 
 
 notifications_bp = Blueprint("notifications", __name__)
 
-@notifications_bp.before_request
 @token_required
-def require_token():
+def _require_bearer_token():
     pass
 
-crud_factory(notifications_bp, Notification, "notifications", ["user", "actor", "recipe", "type", "message"], user_owned = True, exclude_methods=["POST", "PATCH", "DELETE"])
+@notifications_bp.before_request
+def require_token():
+    # The stream authenticates itself, since EventSource cannot send the Authorization header
+    if request.endpoint == "notifications.stream_notifications":
+        return None
+    return _require_bearer_token()
+
+# /my-notifications lists the newest notifications first
+crud_factory(notifications_bp, Notification, "notifications", ["user", "actor", "recipe", "type", "message"], user_owned = True, exclude_methods=["POST", "PATCH", "DELETE"], newest_first="createdAt")
 
 @notifications_bp.route("/my-notifications/<notification_id>", methods=["PATCH"])
 def update_notification(notification_id):
@@ -38,4 +58,102 @@ def update_notification(notification_id):
         "message":"Notification marked as read",
         "id": str(notification.id),
         "read": notification.read
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@notifications_bp.route("/my-notifications", methods=["PATCH"])
+def mark_notifications_read():
+    """Mark all of the user's unread notifications as read, or only those listed in "ids"."""
+    data = request.get_json() or {}
+
+    if data.get("read") is not True:
+        return jsonify({"error": "You can only mark notifications as read"}), 400
+
+    ids = data.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, str) and ObjectId.is_valid(i) for i in ids):
+            return jsonify({"error": "ids must be a list of notification ids"}), 400
+
+    queryset = Notification.objects(user=request.user_id, read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    # Single update_many instead of a load/check/save per notification
+    updated = queryset.update(set__read=True)
+
+    return jsonify({
+        "message": f"Marked {updated} notifications as read",
+        "updated": updated
+    }), 200
+
+
+@notifications_bp.route("/my-notifications/unread-count", methods=["GET"])
+def get_unread_count():
+    # count_documents served by the (user, read, -createdAt) index
+    unread = Notification.objects(user=request.user_id, read=False).count()
+    return jsonify({"unread": unread}), 200
+
+
+@notifications_bp.route("/my-notifications/stream-token", methods=["POST"])
+def create_stream_token():
+    """Short-lived token for opening the stream with EventSource: /my-notifications/stream?token=..."""
+    token = create_scoped_token(request.token_claims, STREAM_TOKEN_SCOPE, STREAM_TOKEN_LIFETIME)
+    return jsonify({"token": token, "expires_in": int(STREAM_TOKEN_LIFETIME.total_seconds())}), 200
+
+
+def _stream_session():
+    """Claims the stream was opened with, from ?token= (browsers) or an Authorization header. Returns (claims, error)."""
+    token = request.args.get("token")
+    if token:
+        return decode_token(token, scope=STREAM_TOKEN_SCOPE)
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None, "Missing token!"
+    return decode_token(auth_header.split(" ")[1])
+
+
+@notifications_bp.route("/my-notifications/stream", methods=["GET"])
+def stream_notifications():
+    """
+    Server-Sent Events stream of the user's new notifications, replacing polling of /my-notifications.
+
+    The stream checks its session at every event and heartbeat, and ends with
+    an "end" event once the session is signed out or expires.
+    """
+    claims, error = _stream_session()
+    if error:
+        return jsonify({"error": error}), 401
+
+    channel = claims["user_id"]
+    jti = claims["jti"]
+    session_exp = claims.get("session_exp", claims.get("exp"))
+    subscription = notification_pubsub.subscribe(channel)
+
+    def session_ended():
+        return revocation_cache.is_revoked(jti) or (session_exp is not None and time.time() >= session_exp)
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    notification = subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    notification = None
+
+                if session_ended():
+                    yield "event: end\ndata: {}\n\n"
+                    return
+                if notification is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: notification\nid: {notification['id']}\ndata: {json.dumps(notification)}\n\n"
+        finally:
+            notification_pubsub.unsubscribe(channel, subscription)
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -3,25 +3,61 @@ from models.recipe import Recipe
 from models.user import User
 from models.comment import Comment
 from models.notification import Notification
+from models.user_stats import UserStats
 from utils.crud_factory import crud_factory
-from utils.crud_utils import get_document_or_404, update_document_fields
+from utils.crud_utils import (
+    get_document_or_404, update_document_fields, parse_page_size, parse_fields, project, paginate_newest_first
+)
 from utils.jwt_utils import token_required
+from utils.serializers import serialize_recipes, serialize_comments
+from utils.refs import ref_id, ref_ids
+from utils.notification_queue import notification_queue
+from utils.images import load_image, store_variants, delete_variants
+from utils.db import get_fs
 from werkzeug.utils import secure_filename
-import random, json
+from utils.cache import TTLCache
+from utils.response_cache import response_cache, cache_tag
+from utils.search import ingredient_terms
+import json
 from datetime import datetime, timedelta
 
+POPULAR_DEFAULT_N = 4
+POPULAR_MAX_N = 50
+POPULAR_CACHE_TTL = 300  # seconds
+POPULAR_WINDOWS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+}
 
-_last_random_refresh = None
-_last_random_recipes = []
+# (n, window) -> ranked list of Recipe documents; cleared on every like toggle
+popular_cache = TTLCache(ttl=POPULAR_CACHE_TTL, name="popular_recipes")
 
 recipes_bp = Blueprint("recipes", __name__)
 
+# Fields toggle_like needs back from its atomic update
+LIKE_FIELDS = ("title", "user", "likesCount")
+
 @recipes_bp.before_request
 @token_required
 def require_token():
     # This ensures token_required runs before every request to this blueprint
     pass
 
+#___________
+#Clean up after a recipe that is about to be deleted
+#___________
+def forget_recipe(recipe):
+    """Take a recipe (with its cascaded comments) out of UserStats and drop its image variants."""
+    UserStats.bump(ref_id(recipe, "user"), recipeCount=-1, likesReceived=-recipe.likesCount)
+    for row in Comment.objects(recipe=recipe.id).aggregate({"$group": {"_id": "$user", "comments": {"$sum": 1}}}):
+        UserStats.bump(row["_id"], commentCount=-row["comments"])
+
+    # doc.delete() removes the original GridFS file, but not the variants stored next to it
+    if recipe.image and recipe.image.grid_id:
+        delete_variants(get_fs(), recipe.image.grid_id)
+
+
 crud_factory(
     recipes_bp, 
     Recipe, 
@@ -38,7 +74,11 @@ crud_factory(
         "tags", 
         "category"
     ], 
-    user_owned=True,exclude_methods=["POST", "PATCH"]
+    user_owned=True,exclude_methods=["POST", "PATCH"],
+    on_delete=forget_recipe,
+    # After the delete, so a /recipes/popular request cannot cache the recipe again in between
+    after_delete=lambda recipe: popular_cache.clear(),
+    cached=True
 )
 
 #___________
@@ -49,8 +89,12 @@ def get_quick_recipes(max_cook_time):
     if max_cook_time <= 0:
         return jsonify({"error": "Max cook time must be greater than 0"}), 400
 
+    fields, err, code = parse_fields(Recipe)
+    if err:
+        return jsonify(err), code
+
     try:
-        recipes = Recipe.objects(cookTime__lte=max_cook_time).order_by('cookTime')
+        recipes = list(project(Recipe.objects(cookTime__lte=max_cook_time), Recipe, fields).order_by('cookTime'))
 
         if not recipes:
             return jsonify({
@@ -61,7 +105,7 @@ def get_quick_recipes(max_cook_time):
     
         return jsonify({
             "message": f"Found {len(recipes)} recipes with cook time ≤ {max_cook_time} minutes",
-            "data": [recipe.to_dict() for recipe in recipes],
+            "data": serialize_recipes(recipes, fields=fields),
             "max_cook_time": max_cook_time
         }), 200
 
@@ -71,63 +115,167 @@ def get_quick_recipes(max_cook_time):
             "details": str(e)
         }), 500
 
+#___________
+#Search recipes
+#___________
+@recipes_bp.route("/recipes/search", methods=["GET"])
+def search_recipes():
+    """
+    ?q=<text> matches title, name, tags, category and ingredients through the text index.
+    ?ingredients=<a,b,c> ranks recipes by how few ingredients they need beyond the given ones.
+    Both can be combined. Pages are ranked, so the cursor is an offset: ?limit= and ?after=<next_cursor>.
+    Supports ?fields= / ?view= like the other recipe lists.
+    """
+    q = (request.args.get("q") or "").strip()
+    terms = ingredient_terms((request.args.get("ingredients") or "").split(","))
+    if not q and not terms:
+        return jsonify({"error": "Provide a search query (q) and/or ingredients"}), 400
+
+    limit, err, code = parse_page_size()
+    if err:
+        return jsonify(err), code
+    fields, err, code = parse_fields(Recipe)
+    if err:
+        return jsonify(err), code
+    offset = max(request.args.get("after", 0, type=int), 0)
+
+    match, projection, sort = {}, {"_id": 1}, {}
+    if q:
+        match["$text"] = {"$search": q}
+    if terms:
+        # Multikey index on ingredientTerms narrows to recipes using at least one of them
+        match["ingredientTerms"] = {"$in": terms}
+        projection["missing"] = {"$size": {"$setDifference": [{"$ifNull": ["$ingredientTerms", []]}, terms]}}
+        projection["matched"] = {"$size": {"$setIntersection": [{"$ifNull": ["$ingredientTerms", []]}, terms]}}
+        sort["missing"] = 1
+        sort["matched"] = -1
+    if q:
+        projection["score"] = {"$meta": "textScore"}
+        sort["score"] = -1
+    sort["_id"] = 1
+
+    pipeline = [
+        {"$match": match},
+        {"$project": projection},
+        {"$sort": sort},
+        {"$skip": offset},
+        {"$limit": limit + 1}
+    ]
+
+    try:
+        ranked_ids = [doc["_id"] for doc in Recipe.objects.aggregate(*pipeline)]
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to search recipes",
+            "details": str(e)
+        }), 500
+
+    next_cursor = None
+    if len(ranked_ids) > limit:
+        ranked_ids = ranked_ids[:limit]
+        next_cursor = str(offset + limit)
+
+    # $in does not preserve order, so put the page back into ranked order
+    recipes_by_id = {recipe.id: recipe for recipe in project(Recipe.objects(id__in=ranked_ids), Recipe, fields)}
+    recipes = [recipes_by_id[rid] for rid in ranked_ids if rid in recipes_by_id]
+
+    return jsonify({
+        "message": f"Found {len(recipes)} matching recipes",
+        "data": serialize_recipes(recipes, fields=fields),
+        "next_cursor": next_cursor
+    }), 200
+
 #___________
 #Get recipe's comments
 #___________
 @recipes_bp.route("/recipes/<recipe_id>/comments", methods=["GET"])
 def get_recipe_comments(recipe_id):
-    recipe = Recipe.objects(id=recipe_id).first()
+    """Newest first, one page at a time: ?limit= and ?after=<next_cursor>. The total is Recipe.commentCount."""
+    recipe = Recipe.objects(id=recipe_id).only("id").first()
     if not recipe:
         return jsonify({"error": "Recipe not found"}), 404
 
-    comments = Comment.objects(recipe=recipe)
-    return jsonify([{
-        "id": str(comment.id),
-        "body": comment.body,
-        "username": comment.user.username if comment.user else None,
-        "time": comment.time.isoformat()
-    }for comment in comments]), 200
+    # Served by the (recipe, -time, -_id) index; usernames come from one batched query per page
+    page, err, code = paginate_newest_first(Comment.objects(recipe=recipe.id), "time")
+    if err:
+        return jsonify(err), code
+
+    comments = page["docs"]
+    if not comments:
+        return jsonify({
+            "message": "No comments found",
+            "data": [],
+            "next_cursor": None
+        }), 200
+
+    return jsonify({
+        "message": f"Found {len(comments)} comments",
+        "data": serialize_comments(comments),
+        "next_cursor": page["next_cursor"]
+    }), 200
 
 
 #___________
 #Get popular recipes
 #___________
+def _rank_popular_recipes(n, window):
+    """Top n recipes by likesCount (optionally created within window), topped up with a random sample."""
+    since = datetime.utcnow() - POPULAR_WINDOWS[window] if window else None
+    created_filter = {"createdAt__gte": since} if since else {}
+
+    # Served by the (-likesCount, -createdAt) index instead of sorting the collection in Python
+    top_recipes = list(
+        Recipe.objects(likesCount__gt=0, **created_filter)
+        .order_by("-likesCount", "-createdAt")
+        .limit(n)
+    )
+
+    if len(top_recipes) < n:
+        # Not enough liked recipes: fill the remainder with random unliked ones.
+        # The result is cached, so the random picks stay stable for the TTL.
+        match = {"likesCount": {"$not": {"$gt": 0}}}
+        if since:
+            match["createdAt"] = {"$gte": since}
+        pipeline = [
+            {"$match": match},
+            {"$sample": {"size": n - len(top_recipes)}},
+            {"$project": {"_id": 1}}
+        ]
+        sampled_ids = [doc["_id"] for doc in Recipe.objects.aggregate(*pipeline)]
+        top_recipes += list(Recipe.objects(id__in=sampled_ids))
+
+    return top_recipes
+
+
 @recipes_bp.route("/recipes/popular", methods = ["GET"])
 def get_popular_recipes():
-    global _last_random_refresh, _last_random_recipes
-
-    all_recipes = list(Recipe.objects)
-    sorted_recipes = sorted(all_recipes, key=lambda r: len(r.likedBy), reverse=True)
-
-    # Get all recipes with likes
-    liked_recipes = [r for r in sorted_recipes if len(r.likedBy) > 0]
-
-    if len(liked_recipes) >= 4:
-        # Take top 4
-        top_recipes = liked_recipes[:4]
-    elif 0 < len(liked_recipes) < 4:
-        # Take all liked, then fill the remainder with random recipes (excluding already chosen ones)
-        remaining_needed = 4 - len(liked_recipes)
-        remaining_pool = [r for r in all_recipes if r not in liked_recipes]
-        random_recipes = random.sample(remaining_pool, min(remaining_needed, len(remaining_pool)))
-        top_recipes = liked_recipes + random_recipes
-    else:
-        # No liked recipes → fallback to random (refresh every 4 hours)
-        now = datetime.utcnow()
-        if not _last_random_recipes or not _last_random_refresh or (now - _last_random_refresh > timedelta(hours=4)):
-            _last_random_recipes = random.sample(all_recipes, min(4, len(all_recipes)))
-            _last_random_refresh = now
-        top_recipes = _last_random_recipes
+    n = request.args.get("n", POPULAR_DEFAULT_N, type=int)
+    if n <= 0:
+        return jsonify({"error": "n must be greater than 0"}), 400
+    n = min(n, POPULAR_MAX_N)
+
+    window = request.args.get("window")
+    if window and window not in POPULAR_WINDOWS:
+        return jsonify({
+            "error": f"window must be one of: {', '.join(POPULAR_WINDOWS)}"
+        }), 400
+
+    key = (n, window)
+    top_recipes = popular_cache.get(key)
+    if top_recipes is None:
+        top_recipes = _rank_popular_recipes(n, window)
+        popular_cache.set(key, top_recipes)
 
     return jsonify({
-        "message": "Top 4 popular recipes",
-        "data": [r.to_dict() for r in top_recipes]
+        "message": f"Top {n} popular recipes" + (f" this {window}" if window else ""),
+        "data": serialize_recipes(top_recipes)
     }), 200
 
 #___________
 #Get user for a specific recipe
 #___________
 @recipes_bp.route("/recipes/<recipe_id>/user", methods=["GET"])
+@response_cache.cached("recipes.user", tags=lambda recipe_id: [recipe_id])
 def get_recipe_user(recipe_id):
     recipe = Recipe.objects(id=recipe_id).first()
     if not recipe:
@@ -136,6 +284,7 @@ def get_recipe_user(recipe_id):
     user = recipe.user
     if not user:
         return jsonify({"error": "User not found for this recipe"}), 404
+    cache_tag(user.id)
     
     return jsonify({
         "id": str(user.id),
@@ -161,6 +310,12 @@ def create_recipe():
         if not image:
             return jsonify({"error": "Image is required"}), 400
 
+        image_data = image.read()
+        try:
+            picture = load_image(image_data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         
         try:
             ingredients = json.loads(request.form.get("ingredients", "[]"))
@@ -195,13 +350,15 @@ def create_recipe():
 
         
         recipe.image.put(
-            image,
+            image_data,
             content_type=image.content_type,
             filename=image.filename
         )
+        store_variants(get_fs(), recipe.image.grid_id, picture, image.filename)
 
         
         recipe.save()
+        UserStats.bump(user.id, recipeCount=1)
 
         return jsonify({
             "message": "Recipe created successfully",
@@ -249,14 +406,27 @@ def update_recipe(recipe_id):
         
         new_image = request.files.get("image")
         if new_image:
+            image_data = new_image.read()
+            try:
+                picture = load_image(image_data)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            fs = get_fs()
+            old_image_id = recipe.image.grid_id
             recipe.image.replace(
-                new_image,
+                image_data,
                 content_type=new_image.content_type,
                 filename=new_image.filename
             )
+            if old_image_id:
+                delete_variants(fs, old_image_id)
+            store_variants(fs, recipe.image.grid_id, picture, new_image.filename)
 
         
         recipe.save()
+        popular_cache.clear()
+        response_cache.invalidate(recipe.id)
 
         return jsonify({
             "message": "Recipe updated successfully",
@@ -271,65 +441,94 @@ def update_recipe(recipe_id):
 #___________
 @recipes_bp.route("/recipes/<recipe_id>/like", methods=["POST"])
 def toggle_like(recipe_id):
-    recipe = Recipe.objects(id=recipe_id).first()
-    if not recipe:
-        return jsonify({"error": "Recipe not found"}), 404
-    
-    user = User.objects(id=request.user_id).first()
+    user = User.objects(id=request.user_id).only("username").first()
     if not user:
         return jsonify({"error": "User not found"}), 404
-    
-    if user in recipe.likedBy:
-        recipe.likedBy.remove(user)
-        recipe.save()
 
-        Notification.objects(
-            user = recipe.user,
-            actor = user,
-            recipe = recipe,
+    # Each branch is a single atomic update that only matches if the like state is
+    # what we expect, so concurrent clicks can never double count
+    recipe = Recipe.objects(id=recipe_id, likedBy=user).only(*LIKE_FIELDS).modify(
+        pull__likedBy=user,
+        dec__likesCount=1,
+        new=True
+    )
+
+    if recipe:
+        popular_cache.clear()
+        response_cache.invalidate(recipe.id)
+        owner_id = ref_id(recipe, "user")
+        UserStats.bump(owner_id, likesReceived=-1)
+        notification_queue.enqueue_delete(
+            ("favorite", str(owner_id), str(user.id), str(recipe.id)),
+            user = owner_id,
+            actor = user.id,
+            recipe = recipe.id,
             type="favorite"
-        ).delete()
+        )
 
         return jsonify({
             "message": f"You unliked recipe '{recipe.title}'",
-            "likeCount":len(recipe.likedBy),
+            "likeCount": recipe.likesCount,
             "liked": False
         }), 200
 
-    else:
-        recipe.likedBy.append(user)
-        recipe.save()
-
+    recipe = Recipe.objects(id=recipe_id, likedBy__ne=user).only(*LIKE_FIELDS).modify(
+        add_to_set__likedBy=user,
+        inc__likesCount=1,
+        new=True
+    )
+    if not recipe:
+        # Either the recipe is gone, or a concurrent toggle by the same user changed the
+        # like state between the two updates; report the state that won
+        recipe = Recipe.objects(id=recipe_id).only(*LIKE_FIELDS).first()
+        if not recipe:
+            return jsonify({"error": "Recipe not found"}), 404
+        liked = Recipe.objects(id=recipe_id, likedBy=user).count() > 0
+        return jsonify({
+            "message": f"You {'already like' if liked else 'no longer like'} recipe '{recipe.title}'",
+            "likeCount": recipe.likesCount,
+            "liked": liked
+        }), 200
 
-        if str(recipe.user.id) != str(user.id):
+    popular_cache.clear()
+    response_cache.invalidate(recipe.id)
+    owner_id = ref_id(recipe, "user")
+    UserStats.bump(owner_id, likesReceived=1)
+    if str(owner_id) != str(user.id):
+        # Written by the background queue; an unlike within the batch window cancels it
+        notification_queue.enqueue_create(
+            ("favorite", str(owner_id), str(user.id), str(recipe.id)),
             Notification(
-                user=recipe.user,
+                user=owner_id,
                 actor = user,
                 recipe=recipe,
                 type="favorite",
                 message=f"{user.username} liked your recipe '{recipe.title}'"
-            ).save()
+            ),
+            actor=user
+        )
 
-        return jsonify({
-            "message": f"You liked recipe '{recipe.title}'",
-            "likeCount": len(recipe.likedBy),
-            "liked": True
-        }), 200
+    return jsonify({
+        "message": f"You liked recipe '{recipe.title}'",
+        "likeCount": recipe.likesCount,
+        "liked": True
+    }), 200
     
 #___________
 #Get recipe like count
 #___________
 
 @recipes_bp.route("/recipes/<recipe_id>/likes", methods=["GET"])
+@response_cache.cached("recipes.likes", tags=lambda recipe_id: [recipe_id])
 def get_like_count(recipe_id):
-    recipe = Recipe.objects(id=recipe_id).first()
+    recipe = Recipe.objects(id=recipe_id).only("likesCount").first()
 
     if not recipe:
         return jsonify({"error": "Recipe not found"}), 404
     
     return jsonify({
         "recipeId": str(recipe.id),
-        "likeCount": len(recipe.likedBy)
+        "likeCount": recipe.likesCount
     }), 200
 
 #___________
@@ -338,33 +537,33 @@ def get_like_count(recipe_id):
 
 @recipes_bp.route("/recipes/<recipe_id>/favorite", methods=["POST"])
 def toggle_favorite(recipe_id):
-    recipe = Recipe.objects(id=recipe_id).first()
+    recipe = Recipe.objects(id=recipe_id).only("title").first()
 
     if not recipe:
         return jsonify({"error": "Recipe not founf"}), 404
     
-    user = User.objects(id=request.user_id).first()
-    
-    if not user:
-        return jsonify({"error":"User not found"}), 404
-    
-    if recipe in user.favoriteRecipeIds:
-        user.favoriteRecipeIds.remove(recipe)
-        user.save()
+    # Same pattern as toggle_like: $pull if already favorited, otherwise $addToSet
+    user = User.objects(id=request.user_id, favoriteRecipeIds=recipe).only("favoriteRecipeIds").modify(
+        pull__favoriteRecipeIds=recipe,
+        new=True
+    )
 
+    if user:
         return jsonify({
             "Message": f"Recipe '{recipe.title}' removed from favorites",
-            "favorites": [str(r.id) for r in user.favoriteRecipeIds],
+            "favorites": [str(rid) for rid in ref_ids(user, "favoriteRecipeIds")],
             "favorited": False
         }), 200
-    else:
-        user.favoriteRecipeIds.append(recipe)
-        user.save()
 
-        return jsonify({
-            "message": f"Recipe '{recipe.title}' added to favorites",
-            "favorites": [str(r.id) for r in user.favoriteRecipeIds],
-            "favorited": True
-        }), 200
-    
-    
\ No newline at end of file
+    user = User.objects(id=request.user_id).only("favoriteRecipeIds").modify(
+        add_to_set__favoriteRecipeIds=recipe,
+        new=True
+    )
+    if not user:
+        return jsonify({"error":"User not found"}), 404
+
+    return jsonify({
+        "message": f"Recipe '{recipe.title}' added to favorites",
+        "favorites": [str(rid) for rid in ref_ids(user, "favoriteRecipeIds")],
+        "favorited": True
+    }), 200
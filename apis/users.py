@@ -1,21 +1,33 @@
 from flask import Blueprint, request, jsonify, current_app
 from models.user import User
-from models.blacklist import BlackList
+from models.blacklist import BlackList, TOKEN_LIFETIME
 from models.recipe import Recipe
 from models.comment import Comment
 from models.notification import Notification
+from models.user_stats import UserStats
 from utils.jwt_utils import token_required
-from mongoengine import get_db
-from gridfs import GridFS
+from utils.revocation import revocation_cache
+from utils.serializers import serialize_recipes
+from utils.refs import ref_ids
+from utils.crud_utils import parse_fields, project
+from utils.images import load_image, store_variants, delete_image
+from utils.db import get_fs
+from utils.response_cache import response_cache, cache_tag
 from bson import ObjectId
 import bcrypt
 import jwt
 import datetime
 import uuid
 import os
+import logging
 
 DEFAULT_PROFILE_PICTURE_ID = os.getenv("DEFAULT_PROFILE_PIC_ID") 
 
+TOP_USERS_DEFAULT_N = 2
+TOP_USERS_MAX_N = 100
+
+logger = logging.getLogger(__name__)
+
 users_bp = Blueprint("users", __name__)
 @users_bp.before_request
 def require_token():
@@ -83,7 +95,7 @@ def signin():
         "user_id": str(user.id),
         "email": user.email,     
         "username": user.username, 
-        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=2),
+        "exp": datetime.datetime.utcnow() + TOKEN_LIFETIME,
         "iat": datetime.datetime.utcnow(),
         "jti": jti
     }, current_app.config["SECRET_KEY"], algorithm="HS256")
@@ -100,9 +112,12 @@ def signout():
     if not jti:
         return jsonify({"error": "Missing token identifier (jti)"}), 401
 
-    # If not already blacklisted, save it
-    if not BlackList.objects(jti=jti).first():
-        BlackList(jti=jti).save()
+    # Insert only if not already blacklisted, in a single round trip
+    BlackList.objects(jti=jti).update_one(
+        upsert=True,
+        set_on_insert__blacklisted_on=datetime.datetime.utcnow()
+    )
+    revocation_cache.add(jti)
 
     return jsonify({"message": "Successfully signed out"}), 200
 
@@ -119,7 +134,7 @@ def get_current_user():
         "id": str(user.id),
         "username": user.username,
         "email": user.email,
-        "favoriteRecipeIds": [str(rid.id) for rid in user.favoriteRecipeIds]  # ensure you map ReferenceField objects
+        "favoriteRecipeIds": [str(rid) for rid in ref_ids(user, "favoriteRecipeIds")]  # ids only, no dereferencing
     }), 200
 
 
@@ -129,6 +144,7 @@ def get_current_user():
 #__________
 
 @users_bp.route("/users/id/<user_id>", methods=["GET"])
+@response_cache.cached("users.by_id", tags=lambda user_id: [user_id])
 def get_user_by_id(user_id):
     user = User.objects(id=user_id).first()
     if not user:
@@ -145,38 +161,51 @@ def get_user_recipes(user_id):
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    recipes = Recipe.objects(user=user)
+    fields, err, code = parse_fields(Recipe)
+    if err:
+        return jsonify(err), code
+
+    recipes = list(project(Recipe.objects(user=user), Recipe, fields))
     if not recipes:
         return jsonify({"message": "This user has no recipes yet"}), 200
 
-    return jsonify([recipe.to_dict() for recipe in recipes])
+    return jsonify(serialize_recipes(recipes, fields=fields))
 
 #___________
 #Get top users
 #___________
 @users_bp.route("/top-users", methods=["GET"])
 def get_top_users():
+    n = request.args.get("n", TOP_USERS_DEFAULT_N, type=int)
+    if n <= 0:
+        return jsonify({"error": "n must be greater than 0"}), 400
+    n = min(n, TOP_USERS_MAX_N)
+
     try:
-        # Aggregate recipes grouped by user_id
-        pipeline = [
-            {"$group": {"_id": "$user", "recipe_count": {"$sum": 1}}},
-            {"$sort": {"recipe_count": -1}},
-            {"$limit": 2}
-        ]
+        # Served from the materialized UserStats counters via the (-recipeCount, -likesReceived) index
+        stats = list(
+            UserStats.objects(recipeCount__gt=0)
+            .order_by("-recipeCount", "-likesReceived")
+            .limit(n)
+            .as_pymongo()
+        )
 
-        results = Recipe.objects.aggregate(*pipeline)
+        # Resolve all users with one $in query instead of one query per result
+        users = {user.id: user for user in User.objects(id__in=[row["user"] for row in stats])}
 
         top_users = []
-        for result in results:
-            user = User.objects(id=result["_id"]).first()
+        for row in stats:
+            user = users.get(row["user"])
             if user:
                 top_users.append({
                     "user": user.to_dict(),
-                    "recipe_count": result["recipe_count"]
+                    "recipe_count": row.get("recipeCount", 0),
+                    "likes_received": row.get("likesReceived", 0),
+                    "comment_count": row.get("commentCount", 0)
                 })
 
         return jsonify({
-            "message": "Top 2 users with the highest number of recipes",
+            "message": f"Top {n} users with the highest number of recipes",
             "data": top_users
         }), 200
 
@@ -191,15 +220,17 @@ def get_top_users():
 #___________
 
 @users_bp.route("/users/username/<string:username>", methods=["GET"])
+@response_cache.cached("users.by_username")
 def get_user_by_username(username):
     try:
-        print("Looking for username:", username)
+        logger.debug("Looking for username: %s", username)
 
         user = User.objects(username=username).first()
         if not user:
             return jsonify({
                 "message": f"User with username '{username}' not found"
             }), 404
+        cache_tag(user.id)
 
         return jsonify({
             "message": f"User '{username}' found",
@@ -222,7 +253,7 @@ def get_user_favorites():
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    favorites = [recipe.to_dict() for recipe in user.favoriteRecipeIds]
+    favorites = serialize_recipes(user.favoriteRecipeIds)
 
     return jsonify({
         "message": f"Found {len(favorites)} favorite recipes",
@@ -240,7 +271,7 @@ def get_my_favorites():
         return jsonify({"error": "User not found"}), 404
 
     # favoriteRecipeIds is a list of Recipe references; return string ids
-    fav_ids = [str(r.id) for r in (user.favoriteRecipeIds or [])]
+    fav_ids = [str(rid) for rid in ref_ids(user, "favoriteRecipeIds")]
     return jsonify({"favoriteRecipeIds": fav_ids}), 200
 
 #___________
@@ -262,9 +293,14 @@ def upload_profile_picture():
         file.seek(0)
         if size > 2 * 1024 * 1024:
             return jsonify({"error": "File too large. Max size is 2MB"}), 400
+
+        image_data = file.read()
+        try:
+            picture = load_image(image_data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        db = get_db()
-        fs = GridFS(db)
+        fs = get_fs()
 
         user = User.objects(id=request.user_id).first()
         if not user:
@@ -272,14 +308,16 @@ def upload_profile_picture():
         
         if user.profile_picture_id and user.profile_picture_id != DEFAULT_PROFILE_PICTURE_ID:
             try:
-                fs.delete(ObjectId(user.profile_picture_id))
+                delete_image(fs, ObjectId(user.profile_picture_id))
             except Exception as e:
-                print(f"[WARN] failed to delete old profile picture: {e}")
+                logger.warning("Failed to delete old profile picture: %s", e)
 
-        file_id = fs.put(file, filename=file.filename, content_type = file.content_type)
+        file_id = fs.put(image_data, filename=file.filename, content_type = file.content_type)
+        store_variants(fs, file_id, picture, file.filename)
 
         user.profile_picture_id = str(file_id)
         user.save()
+        response_cache.invalidate(user.id)
 
         return jsonify({
             "message": "Profile picture updated successfully",
@@ -287,7 +325,7 @@ def upload_profile_picture():
         })
     
     except Exception as e:
-        print(f"[ERROR] Upload failed: {e}")
+        logger.error("Profile picture upload failed: %s", e)
         return jsonify({"error": "Upload failed", "details": str(e)}), 500
 
 #___________
@@ -297,8 +335,7 @@ def upload_profile_picture():
 @users_bp.route("/users/profile_picture/reset", methods=["POST"])
 def reset_profile_picture():
     try:
-        db = get_db()
-        fs = GridFS(db)
+        fs = get_fs()
 
         user = User.objects(id=request.user_id).first()
         if not user:
@@ -306,12 +343,13 @@ def reset_profile_picture():
         
         if user.profile_picture_id and user.profile_picture_id != DEFAULT_PROFILE_PICTURE_ID:
             try:
-                fs.delete(ObjectId(user.profile_picture_id))
+                delete_image(fs, ObjectId(user.profile_picture_id))
             except Exception as e:
-                print(f"[WARN] Failed to delete old profile picture: {e}")
+                logger.warning("Failed to delete old profile picture: %s", e)
 
         user.profile_picture_id = DEFAULT_PROFILE_PICTURE_ID
         user.save()
+        response_cache.invalidate(user.id)
 
         return jsonify({
             "message": "Profile picture set to default",
@@ -1,70 +1,76 @@
+from dotenv import load_dotenv
+
+# Before anything else is imported: many modules read their settings from the
+# environment at import time (JSON_BACKEND, COMPRESS_MIN_SIZE, cache TTLs, ...)
+load_dotenv()
+
 from flask import Flask
 from flask_cors import CORS
-from pymongo import MongoClient
-from mongoengine import connect, connection
-from dotenv import load_dotenv
 from apis.users import users_bp
 from apis.recipes import recipes_bp
 from apis.comments import comments_bp
 from apis.notifications import notifications_bp
 from apis.images import images_bp
+from apis.health import health_bp
+from commands import register_commands
+from utils.db import init_db
+from utils.json_provider import create_json_provider
+from utils.http_middleware import init_http_middleware
+from utils.instrumentation import init_instrumentation
+from utils.metrics import init_metrics
 import os
-import certifi
 
-load_dotenv()
 
-app = Flask(__name__)
+def create_app():
+    app = Flask(__name__)
+    app.json = create_json_provider(app)
 
+    CORS(
+        app,
+        origins=[
+            "http://localhost:3000",
+            "http://127.0.0.1:3000",
+            "https://recipe-hub-cyan.vercel.app"   # deployed frontend URL
+        ],
+        supports_credentials=True,
+        allow_headers=["Content-Type", "Authorization", "Accept"],
+        methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
+    )
 
-CORS(
-    app,
-    origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "https://recipe-hub-cyan.vercel.app"   # deployed frontend URL
-    ],
-    supports_credentials=True,
-    allow_headers=["Content-Type", "Authorization", "Accept"],
-    methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
-)
+    app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 
+    # Weak ETags / 304s and gzip or brotli compression for JSON responses
+    init_http_middleware(app)
 
+    # Query counts and timings per request (Server-Timing header, slow request log).
+    # Registers a pymongo listener, so it has to run before the MongoClient is created.
+    init_instrumentation(app)
 
-app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+    # Prometheus counters and latency histograms, served at GET /metrics
+    init_metrics(app)
 
+    app.register_blueprint(users_bp)
+    app.register_blueprint(recipes_bp)
+    app.register_blueprint(comments_bp)
+    app.register_blueprint(notifications_bp)
+    app.register_blueprint(images_bp)
+    app.register_blueprint(health_bp)
 
-app.register_blueprint(users_bp)
-app.register_blueprint(recipes_bp)
-app.register_blueprint(comments_bp)
-app.register_blueprint(notifications_bp)
-app.register_blueprint(images_bp)
+    register_commands(app)
 
+    # Registers MONGODB_URI with the pool settings from the environment; the
+    # client itself is created on the first query, i.e. inside each worker
+    init_db(app)
 
-MONGODB_URI = os.getenv("MONGODB_URI")
+    @app.route("/")
+    def home():
+        return {"message": "Recipehub backend is running"}
 
-# Connect MongoEngine
-connect(
-    host=MONGODB_URI,
-    alias="default",
-    tls=True,
-    tlsCAFile=certifi.where()
-)
+    return app
 
 
-@app.route("/")
-def home():
-    return {"message": "Recipehub backend is running"}
+# gunicorn app:app
+app = create_app()
 
-@app.route("/health", methods = ["GET"])
-def health():
-    try:
-        connection.get_connection(alias="default").admin.command("ping")
-        return{"status": "ok", "database": "connected"}, 200
-    except Exception as e:
-        return {
-            "status": "error",
-            "database": "unreachable",
-            "details": str(e)
-        }, 500
 if __name__ == "__main__":
     app.run(debug=True, port=5500)
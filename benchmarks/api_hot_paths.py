@@ -0,0 +1,313 @@
+"""
+Seed a throwaway database with synthetic data and benchmark the API hot paths.
+
+    python -m benchmarks.api_hot_paths [--mongomock] [--users 200] [--recipes 2000] [--requests 200]
+    python -m benchmarks.api_hot_paths --write-baseline benchmarks/baseline.json
+    python -m benchmarks.api_hot_paths --baseline benchmarks/baseline.json   # exits 1 on regression
+
+Requests go through the Flask test client, so the numbers cover routing, auth,
+queries and serialization but not the network or gunicorn. By default the data
+goes into BENCH_MONGODB_URI (mongodb://localhost:27017/recipehub_bench), which is
+dropped first; --mongomock runs fully in memory. Query counts come from the
+Server-Timing header and are only meaningful against a real MongoDB, since
+mongomock does not emit command events.
+"""
+import argparse
+import collections
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+import jwt
+from faker import Faker
+from PIL import Image
+
+DEFAULT_URI = "mongodb://localhost:27017/recipehub_bench"
+SECRET_KEY = "benchmark-secret-key-that-is-long-enough"
+
+# Regression gate: a run fails if an endpoint issues more queries than the baseline,
+# or if its p50/p99 exceed the baseline by more than --tolerance
+LATENCY_TOLERANCE = 0.5
+
+
+def connect_database(use_mongomock):
+    # app registers MONGODB_URI (with TLS) on import; swap that registration for the benchmark database
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost")
+    import app as app_module
+    from mongoengine import connect, disconnect, get_db
+
+    disconnect("default")
+    if use_mongomock:
+        import mongomock
+        import mongomock.gridfs
+
+        mongomock.gridfs.enable_gridfs_integration()
+        connect("recipehub_bench", host="mongodb://localhost", alias="default",
+                mongo_client_class=mongomock.MongoClient)
+    else:
+        connect(host=os.getenv("BENCH_MONGODB_URI", DEFAULT_URI), alias="default")
+        db = get_db()
+        db.client.drop_database(db.name)
+
+    app_module.app.config["SECRET_KEY"] = SECRET_KEY
+    return app_module.app
+
+
+def fake_image(width, height):
+    buffer = io.BytesIO()
+    color = tuple(random.randint(0, 255) for _ in range(3))
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def seed(fake, args):
+    """
+    Insert users, recipes (with likes), comments and notifications in bulk.
+    Returns (user, image_ids, ids of the most-commented recipes).
+    """
+    from bson import ObjectId
+    from flask_bcrypt import generate_password_hash
+
+    from commands.indexes import ensure_indexes
+    from models.comment import Comment
+    from models.notification import Notification
+    from models.recipe import Recipe
+    from models.user import User
+    from models.user_stats import UserStats
+    from utils.db import get_fs
+    from utils.images import load_image, store_variants
+    from utils.search import ingredient_terms
+
+    ensure_indexes()
+
+    # One bcrypt hash shared by everyone; hashing per user would dominate seeding time
+    password_hash = generate_password_hash("password").decode("utf-8")
+    user_ids = [ObjectId() for _ in range(args.users)]
+    User._get_collection().insert_many([
+        User(id=user_id, email=f"user{i}@example.com", username=f"{fake.user_name()}{i}",
+             password_hash=password_hash).to_mongo()
+        for i, user_id in enumerate(user_ids)
+    ])
+
+    # Recipes share a small pool of images, each stored with its resized variants like an upload
+    fs = get_fs()
+    image_ids = []
+    for i in range(args.images):
+        data = fake_image(1200, 900)
+        image_id = fs.put(data, content_type="image/jpeg", filename=f"bench-{i}.jpg")
+        store_variants(fs, image_id, load_image(data), f"bench-{i}.jpg")
+        image_ids.append(image_id)
+
+    recipe_ids = []
+    recipes = []
+    for _ in range(args.recipes):
+        ingredients = [fake.sentence(nb_words=3) for _ in range(random.randint(4, 12))]
+        liked_by = random.sample(user_ids, random.randint(0, min(args.max_likes, len(user_ids))))
+        recipe = Recipe(
+            id=ObjectId(),
+            name=fake.word(),
+            title=fake.sentence(nb_words=4),
+            prepTime=random.randint(5, 60),
+            cookTime=random.randint(5, 120),
+            servings=random.randint(1, 8),
+            createdAt=fake.date_time_between(start_date="-60d"),
+            ingredients=ingredients,
+            ingredientTerms=ingredient_terms(ingredients),
+            directions=[fake.paragraph() for _ in range(random.randint(3, 8))],
+            tags=fake.words(nb=3),
+            category=fake.words(nb=2),
+            user=random.choice(user_ids),
+            likedBy=liked_by,
+            likesCount=len(liked_by),
+        ).to_mongo()
+        recipe["image"] = random.choice(image_ids)
+        recipe_ids.append(recipe["_id"])
+        recipes.append(recipe)
+
+    comments = [
+        Comment(user=random.choice(user_ids), recipe=random.choice(recipe_ids), body=fake.sentence(),
+                time=fake.date_time_between(start_date="-60d")).to_mongo()
+        for _ in range(args.comments)
+    ]
+    comment_counts = collections.Counter(comment["recipe"] for comment in comments)
+    for recipe in recipes:
+        recipe["commentCount"] = comment_counts[recipe["_id"]]
+    Recipe._get_collection().insert_many(recipes)
+    if comments:
+        Comment._get_collection().insert_many(comments)
+
+    # The UserStats rows /top-users reads, as rebuild() would compute them from the data above
+    stats = collections.defaultdict(collections.Counter)
+    for recipe in recipes:
+        stats[recipe["user"]]["recipeCount"] += 1
+        stats[recipe["user"]]["likesReceived"] += recipe["likesCount"]
+    for comment in comments:
+        stats[comment["user"]]["commentCount"] += 1
+    if stats:
+        UserStats._get_collection().insert_many([
+            UserStats(user=user_id, **counters).to_mongo() for user_id, counters in stats.items()
+        ])
+
+    # The benchmark user gets a full notification inbox
+    bench_user = user_ids[0]
+    notifications = [
+        Notification(user=bench_user, actor=random.choice(user_ids), recipe=random.choice(recipe_ids),
+                     type=random.choice(["favorite", "comment"]), message=fake.sentence(),
+                     createdAt=fake.date_time_between(start_date="-30d"),
+                     read=random.random() < 0.5).to_mongo()
+        for _ in range(args.notifications)
+    ]
+    if notifications:
+        Notification._get_collection().insert_many(notifications)
+
+    # Comment threads are read from the most-commented recipes, where pagination matters
+    busiest = [recipe_id for recipe_id, _ in comment_counts.most_common(5)] or recipe_ids[:1]
+    return User.objects.get(id=bench_user), image_ids, busiest
+
+
+def auth_header(user):
+    token = jwt.encode({
+        "user_id": str(user.id),
+        "jti": str(uuid.uuid4()),
+        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+    }, SECRET_KEY, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def endpoints(image_ids, recipe_ids):
+    """name -> list of paths to cycle through."""
+    return {
+        "/recipes": ["/recipes"],
+        "/recipes/popular": ["/recipes/popular"],
+        "/recipes/quick-meals/<n>": [f"/recipes/quick-meals/{n}" for n in (15, 30, 45)],
+        "/top-users": ["/top-users"],
+        "/api/images/<id>": [f"/api/images/{image_id}?w=600" for image_id in image_ids],
+        "/my-notifications": ["/my-notifications"],
+        "/recipes/<id>/comments": [f"/recipes/{recipe_id}/comments" for recipe_id in recipe_ids],
+    }
+
+
+def queries_from(response):
+    # Server-Timing: db;dur=1.2;desc="3 queries", ...
+    header = response.headers.get("Server-Timing", "")
+    for metric in header.split(","):
+        if metric.strip().startswith("db;"):
+            for part in metric.split(";"):
+                if part.startswith("desc="):
+                    return int(part[len("desc="):].strip('"').split()[0])
+    return 0
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_endpoint(client, headers, paths, count, warmup):
+    for i in range(warmup):
+        client.get(paths[i % len(paths)], headers=headers).get_data()
+
+    latencies = []
+    queries = []
+    for i in range(count):
+        started = time.perf_counter()
+        response = client.get(paths[i % len(paths)], headers=headers)
+        response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{paths[i % len(paths)]} returned {response.status_code}: {response.get_data()[:200]!r}")
+        queries.append(queries_from(response))
+
+    # Memory is measured in a separate pass; tracemalloc would inflate the latencies
+    tracemalloc.start()
+    for i in range(min(count, 20)):
+        client.get(paths[i % len(paths)], headers=headers).get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries": max(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result["queries"] > expected["queries"]:
+            failures.append(f"{name}: {result['queries']} queries per request, baseline {expected['queries']}")
+        for key in ("p50_ms", "p99_ms"):
+            limit = expected[key] * (1 + tolerance)
+            if result[key] > limit:
+                failures.append(f"{name}: {key} {result[key]:.2f} > {limit:.2f} (baseline {expected[key]:.2f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongomock", action="store_true", help="seed an in-memory mongomock instead of MongoDB")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--notifications", type=int, default=500)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--max-likes", type=int, default=50, help="upper bound on likes per recipe")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="JSON file from --write-baseline to compare against")
+    parser.add_argument("--write-baseline", help="write this run's results to a JSON file")
+    parser.add_argument("--tolerance", type=float, default=LATENCY_TOLERANCE,
+                        help="allowed latency increase over the baseline (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    Faker.seed(args.seed)
+    random.seed(args.seed)
+    fake = Faker()
+
+    app = connect_database(args.mongomock)
+    started = time.perf_counter()
+    with app.test_request_context():
+        user, image_ids, recipe_ids = seed(fake, args)
+    print(f"Seeded {args.users} users, {args.recipes} recipes, {args.comments} comments, "
+          f"{args.notifications} notifications in {time.perf_counter() - started:.1f}s")
+
+    client = app.test_client()
+    headers = auth_header(user)
+    results = {}
+    print(f"{'endpoint':<28} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KiB':>9}")
+    for name, paths in endpoints(image_ids, recipe_ids).items():
+        result = results[name] = run_endpoint(client, headers, paths, args.requests, args.warmup)
+        print(f"{name:<28} {result['p50_ms']:9.2f} {result['p99_ms']:9.2f} {result['queries']:8d} {result['peak_kib']:9.1f}")
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Wrote baseline to {args.write_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        if failures:
+            print("Regressions against the baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare JSON serialization of a page of recipes before and after the custom provider.
+
+    python -m benchmarks.json_serialization [--recipes 1000] [--repeat 20]
+
+"before" is Flask's stock DefaultJSONProvider on the old Recipe.to_dict() shape
+(raw datetime, sorted keys); the others are the providers in utils/json_provider.py.
+"""
+import argparse
+import random
+import timeit
+
+from bson import ObjectId
+from faker import Faker
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_provider import StdlibJSONProvider, OrjsonProvider, orjson
+
+
+def fake_recipe_page(fake, count, raw_datetimes):
+    page = []
+    for _ in range(count):
+        created = fake.date_time_between(start_date="-1y")
+        page.append({
+            "id": str(ObjectId()),
+            "name": fake.word(),
+            "image": fake.image_url(),
+            "thumbnail": fake.image_url(),
+            "title": fake.sentence(nb_words=4),
+            "prepTime": random.randint(5, 60),
+            "cookTime": random.randint(5, 120),
+            "servings": random.randint(1, 8),
+            "ingredients": [fake.sentence(nb_words=3) for _ in range(random.randint(4, 15))],
+            "directions": [fake.paragraph() for _ in range(random.randint(3, 10))],
+            "tags": fake.words(nb=3),
+            "category": fake.words(nb=2),
+            "userID": str(ObjectId()),
+            "likesCount": random.randint(0, 500),
+            "createdAt": created if raw_datetimes else created.isoformat(),
+            "likedBy": [str(ObjectId()) for _ in range(random.randint(0, 50))],
+            "is_owner": False,
+        })
+    return page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    fake = Faker()
+    Faker.seed(0)
+    random.seed(0)
+    app = Flask(__name__)
+
+    before_page = {"message": "", "data": fake_recipe_page(fake, args.recipes, raw_datetimes=True)}
+    after_page = {"message": "", "data": fake_recipe_page(fake, args.recipes, raw_datetimes=False)}
+
+    candidates = [("before: flask DefaultJSONProvider", DefaultJSONProvider(app), before_page)]
+    candidates.append(("after: StdlibJSONProvider", StdlibJSONProvider(app), after_page))
+    if orjson is not None:
+        candidates.append(("after: OrjsonProvider", OrjsonProvider(app), after_page))
+    else:
+        print("orjson is not installed; skipping OrjsonProvider")
+
+    print(f"Serializing {args.recipes} recipes, best of {args.repeat} runs")
+    baseline = None
+    with app.app_context():
+        for name, provider, page in candidates:
+            # Time the full response build, which is what jsonify() does per request
+            best = min(timeit.repeat(lambda: provider.response(page).get_data(), number=1, repeat=args.repeat))
+            size = len(provider.response(page).get_data())
+            baseline = baseline or best
+            print(f"{name:<36} {best * 1000:8.2f} ms  {size / 1024:8.1f} KiB  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+from commands.indexes import ensure_indexes_command, check_indexes_command
+from commands.user_stats import rebuild_user_stats_command
+from commands.recipe_io import import_recipes_command, export_recipes_command
+from commands.migrate import migrate_command
+
+
+def register_commands(app):
+    """Attach the maintenance commands to `flask --app app <command>`."""
+    app.cli.add_command(ensure_indexes_command)
+    app.cli.add_command(check_indexes_command)
+    app.cli.add_command(rebuild_user_stats_command)
+    app.cli.add_command(import_recipes_command)
+    app.cli.add_command(export_recipes_command)
+    app.cli.add_command(migrate_command)
@@ -0,0 +1,103 @@
+import datetime
+import sys
+
+import click
+from bson import ObjectId
+from mongoengine import Q, get_db
+
+from models.user import User
+from models.recipe import Recipe
+from models.comment import Comment
+from models.notification import Notification
+from models.blacklist import BlackList
+from models.user_stats import UserStats
+from models.migration import AppliedMigration
+from utils.images import ensure_variant_index
+
+MODELS = (User, Recipe, Comment, Notification, BlackList, UserStats, AppliedMigration)
+
+
+def query_shapes():
+    """
+    (endpoint, queryset) pairs mirroring the queries the API runs.
+
+    Keep this in step with apis/: a new filter or sort on a list endpoint
+    should get a shape here so check-indexes can catch a missing index.
+    """
+    some_id = ObjectId()
+    week_ago = datetime.datetime.utcnow() - datetime.timedelta(weeks=1)
+
+    return [
+        ("GET /recipes", Recipe.objects().order_by("id").limit(21)),
+        ("GET /my-recipes", Recipe.objects(user=some_id).order_by("id").limit(21)),
+        ("GET /recipes/quick-meals/<n>", Recipe.objects(cookTime__lte=30).order_by("cookTime")),
+        ("GET /recipes/popular", Recipe.objects(likesCount__gt=0).order_by("-likesCount", "-createdAt").limit(4)),
+        ("GET /recipes/popular?window=week",
+            Recipe.objects(likesCount__gt=0, createdAt__gte=week_ago).order_by("-likesCount", "-createdAt").limit(4)),
+        ("GET /users/<id>/recipes", Recipe.objects(user=some_id)),
+        ("GET /recipes/search?q=", Recipe.objects.search_text("chicken")),
+        ("GET /recipes/search?ingredients=", Recipe.objects(ingredientTerms__in=["chicken", "rice"])),
+        ("GET /recipes/<id>/comments",
+            Comment.objects(recipe=some_id).order_by("-time", "-id").limit(21)),
+        ("GET /recipes/<id>/comments?after=",
+            Comment.objects(Q(time__lt=week_ago) | Q(time=week_ago, id__lt=some_id), recipe=some_id)
+            .order_by("-time", "-id").limit(21)),
+        ("GET /my-comments", Comment.objects(user=some_id).order_by("id").limit(21)),
+        ("GET /my-notifications", Notification.objects(user=some_id).order_by("-createdAt", "-id").limit(21)),
+        ("GET /my-notifications?after=",
+            Notification.objects(Q(createdAt__lt=week_ago) | Q(createdAt=week_ago, id__lt=some_id), user=some_id)
+            .order_by("-createdAt", "-id").limit(21)),
+        ("GET /my-notifications/unread-count", Notification.objects(user=some_id, read=False)),
+        ("POST /recipes/<id>/like (unlike cleanup)",
+            Notification.objects(user=some_id, actor=some_id, recipe=some_id, type="favorite")),
+        ("token_required (revocation sync)", BlackList.objects(blacklisted_on__gte=week_ago)),
+        ("POST /signin", User.objects(email="someone@example.com")),
+        ("GET /users/username/<name>", User.objects(username="someone")),
+        ("GET /top-users", UserStats.objects(recipeCount__gt=0).order_by("-recipeCount", "-likesReceived").limit(2)),
+        ("UserStats.bump", UserStats.objects(user=some_id)),
+    ]
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def ensure_indexes():
+    for model in MODELS:
+        model.ensure_indexes()
+    ensure_variant_index(get_db())
+
+
+@click.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create every declared model index plus the GridFS variant index."""
+    ensure_indexes()
+    click.echo("Indexes are up to date")
+
+
+@click.command("check-indexes")
+def check_indexes_command():
+    """Explain each endpoint's query shape and fail if any of them needs a COLLSCAN."""
+    ensure_indexes()
+
+    failures = []
+    for endpoint, queryset in query_shapes():
+        winning_plan = queryset.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_plan_stages(winning_plan))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        if status == "COLLSCAN":
+            failures.append(endpoint)
+        click.echo(f"{status:<9} {endpoint}  [{' <- '.join(stages)}]")
+
+    if failures:
+        click.echo(f"{len(failures)} query shape(s) scan the whole collection", err=True)
+        sys.exit(1)
+    click.echo("All query shapes use an index")
@@ -0,0 +1,92 @@
+import datetime
+import time
+
+import click
+from mongoengine import NotUniqueError
+
+from models.migration import AppliedMigration
+from utils.migrations import MigrationContext, discover, MIGRATION_BATCH_SIZE, MIGRATION_PAUSE_MS
+
+
+@click.command("migrate")
+@click.option("--status", is_flag=True, help="List migrations and whether they have been applied, then exit")
+@click.option("--to", "target", help="Stop after this migration (e.g. 0002 or 0002_backfill_likes_count)")
+@click.option("--batch-size", default=MIGRATION_BATCH_SIZE, show_default=True, help="Documents per batch")
+@click.option("--pause-ms", default=MIGRATION_PAUSE_MS, show_default=True, help="Sleep between batches")
+@click.option(
+    "--force-unlock", is_flag=True,
+    help="Take over migrations left 'running' by a process that died (make sure nothing else is migrating)"
+)
+def migrate_command(status, target, batch_size, pause_ms, force_unlock):
+    """Apply pending data migrations from migrations/ in order."""
+    records = {migration.name: migration for migration in AppliedMigration.objects}
+    migrations = discover()
+
+    if status:
+        for name, module in migrations:
+            record = records.get(name)
+            state = record.state if record else "pending"
+            since = f" (since {record.startedAt:%Y-%m-%d %H:%M:%S} UTC)" if state == "running" else ""
+            click.echo(f"{state:<8} {name}  {module.description}{since}")
+        return
+
+    # Only "applied" counts as done; a "running" record is a lock that may have outlived its process
+    pending = [
+        (name, module) for name, module in migrations
+        if name not in records or records[name].state != "applied"
+    ]
+    if target:
+        names = [name for name, _ in migrations]
+        matches = [name for name in names if name == target or name.split("_", 1)[0] == target]
+        if not matches:
+            raise click.ClickException(f"No migration named {target}")
+        pending = [(name, module) for name, module in pending if name <= matches[0]]
+
+    if not pending:
+        click.echo("No pending migrations")
+        return
+
+    locked = [records[name] for name, _ in pending if name in records]
+    if locked and not force_unlock:
+        details = ", ".join(f"{record.name} (started {record.startedAt:%Y-%m-%d %H:%M:%S} UTC)" for record in locked)
+        raise click.ClickException(
+            f"Migrations marked as running: {details}. Another process may be applying them, or a "
+            "previous run died part-way. If nothing else is migrating, rerun with --force-unlock."
+        )
+
+    for name, module in pending:
+        record = _take_over(records[name]) if name in records else _lock(name)
+
+        click.echo(f"Applying {name}: {module.description}")
+        started = time.monotonic()
+        try:
+            module.up(MigrationContext(name, batch_size=batch_size, pause_ms=pause_ms, echo=click.echo))
+        except Exception:
+            # Forget the attempt so the next run retries it
+            record.delete()
+            raise
+
+        record.state = "applied"
+        record.appliedAt = datetime.datetime.utcnow()
+        record.durationSeconds = round(time.monotonic() - started, 2)
+        record.save()
+        click.echo(f"Applied {name} in {record.durationSeconds}s")
+
+
+def _lock(name):
+    # The unique name doubles as a lock against a second deploy migrating at the same time
+    try:
+        return AppliedMigration(name=name).save()
+    except NotUniqueError:
+        raise click.ClickException(f"{name} is already being applied by another process")
+
+
+def _take_over(stale):
+    """Claim a stale "running" record; matching on startedAt makes two concurrent takeovers race safely."""
+    click.echo(f"Taking over {stale.name}, left running since {stale.startedAt:%Y-%m-%d %H:%M:%S} UTC")
+    record = AppliedMigration.objects(name=stale.name, state="running", startedAt=stale.startedAt).modify(
+        set__startedAt=datetime.datetime.utcnow(), new=True
+    )
+    if record is None:
+        raise click.ClickException(f"{stale.name} was taken over or finished by another process")
+    return record
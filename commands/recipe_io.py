@@ -0,0 +1,344 @@
+"""
+Bulk recipe import/export as JSONL, one recipe per line:
+
+    {"id": "...", "name": "...", "title": "...", "prepTime": 10, "cookTime": 20, "servings": 2,
+     "ingredients": [...], "directions": [...], "tags": [...], "category": [...],
+     "createdAt": "2025-01-31T12:00:00", "user": "<username>",
+     "image": {"path": "images/<id>.jpg"}  or  {"base64": "...", "content_type": "image/jpeg"}}
+
+"id" is optional on import. Likes are not carried over: likedBy refers to user
+ids that only mean something in the source database.
+"""
+import base64
+import datetime
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import click
+from bson import ObjectId
+from gridfs.errors import FileExists, NoFile
+from mongoengine import ValidationError
+from pymongo.errors import BulkWriteError
+
+from models.recipe import Recipe
+from models.user import User
+from models.user_stats import UserStats
+from utils.db import get_fs
+from utils.images import load_image, render_variants, put_variant
+from utils.serializers import load_usernames
+
+RECIPE_FIELDS = (
+    "name", "title", "prepTime", "cookTime", "servings",
+    "ingredients", "directions", "tags", "category",
+)
+DUPLICATE_KEY = 11000
+IMAGE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+
+
+def derived_id(timestamp, *parts):
+    """ObjectId from a fixed timestamp and a hash of parts, so re-running an import reproduces the same ids."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).digest()
+    return ObjectId(struct.pack(">I", timestamp) + digest[:8])
+
+
+def _read_image(spec, images_dir):
+    if not isinstance(spec, dict):
+        raise ValueError("image must be an object with 'path' or 'base64'")
+    if spec.get("base64"):
+        return base64.b64decode(spec["base64"], validate=True)
+    if spec.get("path"):
+        with open(os.path.join(images_dir, spec["path"]), "rb") as f:
+            return f.read()
+    raise ValueError("image must have 'path' or 'base64'")
+
+
+def prepare_record(task):
+    """
+    Parse, validate and render one JSONL line. Runs in the import's process pool.
+
+    Returns {"line", "error"} for a bad line, otherwise the recipe's MongoDB
+    document (without user and image), the owner's username and the original
+    image plus its rendered variants, with their ids, ready to be written.
+    """
+    line_no, line, images_dir, started = task
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("expected a JSON object")
+
+        recipe_id = ObjectId(record["id"]) if record.get("id") else derived_id(started, line)
+        recipe = Recipe(id=recipe_id, user=ObjectId(), **{field: record.get(field) for field in RECIPE_FIELDS})
+        if record.get("createdAt"):
+            recipe.createdAt = datetime.datetime.fromisoformat(record["createdAt"])
+
+        try:
+            recipe.validate()  # also runs clean(), which fills ingredientTerms
+        except ValidationError as e:
+            # user and image are attached by the writer
+            errors = {field: str(error) for field, error in (e.errors or {}).items() if field not in ("user", "image")}
+            if errors or not e.errors:
+                raise ValueError(errors or str(e))
+
+        image_spec = record.get("image")
+        data = _read_image(image_spec, images_dir)
+        variants = [
+            (derived_id(started, recipe_id, width, content_type), width, content_type, variant)
+            for width, content_type, variant in render_variants(load_image(data))
+        ]
+    except Exception as e:
+        return {"line": line_no, "error": str(e)}
+
+    document = recipe.to_mongo().to_dict()
+    document.pop("user", None)
+    document.pop("image", None)
+    return {
+        "line": line_no,
+        "recipe": document,
+        "username": record.get("user"),
+        "image": {
+            "id": derived_id(started, recipe_id, "image"),
+            "data": data,
+            "content_type": image_spec.get("content_type") or "image/jpeg",
+            "filename": image_spec.get("filename") or os.path.basename(image_spec.get("path") or "") or None,
+        },
+        "variants": variants,
+    }
+
+
+class Checkpoint:
+    """Progress of one import, saved after every batch so a failed run can pick up where it stopped."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.started = int(datetime.datetime.utcnow().timestamp())
+        self.lines_done = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get("source") != self.source:
+            raise click.ClickException(f"{self.path} belongs to an import of {state.get('source')}")
+        # Keep the original start time so resumed lines derive the same ids
+        self.started = state["started"]
+        self.lines_done = state["lines_done"]
+        return True
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"source": self.source, "started": self.started, "lines_done": self.lines_done}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _put_image(fs, image, variants, clear_partial):
+    """Upload an original image and its variants under their derived ids; existing files are left alone."""
+    if clear_partial:
+        # A crash mid-upload can leave chunks without a files document behind
+        for file_id in [image["id"], *(variant[0] for variant in variants)]:
+            fs.delete(file_id)
+
+    try:
+        fs.put(image["data"], _id=image["id"], content_type=image["content_type"], filename=image["filename"])
+    except FileExists:
+        pass
+    for variant_id, width, content_type, data in variants:
+        try:
+            put_variant(fs, image["id"], width, content_type, data, image["filename"], _id=variant_id)
+        except FileExists:
+            pass
+
+
+def _insert_unordered(collection, documents):
+    """insert_many(ordered=False) that treats duplicate keys as already imported. Returns (inserted, errors)."""
+    if not documents:
+        return 0, []
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids), []
+    except BulkWriteError as e:
+        errors = [error for error in e.details["writeErrors"] if error["code"] != DUPLICATE_KEY]
+        return e.details["nInserted"], errors
+
+
+def _numbered_lines(path, skip):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if line_no > skip and line.strip():
+                yield line_no, line
+
+
+@click.command("import-recipes")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.option("--images-dir", type=click.Path(file_okay=False), help="Base directory for image paths [default: next to SOURCE]")
+@click.option("--owner", help="Username to own recipes whose 'user' is missing or unknown")
+@click.option("--batch-size", default=200, show_default=True, help="Recipes per insert_many")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Validation processes")
+@click.option("--upload-threads", default=8, show_default=True, help="Parallel GridFS uploads")
+@click.option("--checkpoint", "checkpoint_path", type=click.Path(dir_okay=False), help="[default: SOURCE.checkpoint]")
+@click.option("--restart", is_flag=True, help="Re-read from the first line; recipes already imported are still skipped")
+def import_recipes_command(source, images_dir, owner, batch_size, workers, upload_threads, checkpoint_path, restart):
+    """Import recipes from a JSONL file; safe to re-run after a failure."""
+    images_dir = images_dir or os.path.dirname(os.path.abspath(source))
+    checkpoint = Checkpoint(checkpoint_path or f"{source}.checkpoint", source)
+    resumed = checkpoint.load()
+    if resumed and restart:
+        checkpoint.lines_done = 0
+    elif resumed:
+        click.echo(f"Resuming after line {checkpoint.lines_done}")
+
+    default_owner = None
+    if owner:
+        default_owner = User.objects(username=owner).only("id").first()
+        if not default_owner:
+            raise click.ClickException(f"No user named {owner!r}")
+        default_owner = default_owner.id
+
+    fs = get_fs()
+    recipes = Recipe._get_collection()
+    inserted = skipped = 0
+    failed = []
+
+    lines = _numbered_lines(source, checkpoint.lines_done)
+    tasks = ((line_no, line, images_dir, checkpoint.started) for line_no, line in lines)
+
+    # spawn, so the validation processes do not inherit this process's MongoClient
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool, \
+            ThreadPoolExecutor(max_workers=upload_threads) as uploads:
+
+        def submit_batch():
+            return [pool.submit(prepare_record, task) for task in itertools.islice(tasks, batch_size)]
+
+        pending = submit_batch()
+        while pending:
+            results = [future.result() for future in pending]
+            # Validate the next batch while this one is written
+            pending = submit_batch()
+
+            prepared = []
+            for result in results:
+                if "error" in result:
+                    failed.append((result["line"], result["error"]))
+                else:
+                    prepared.append(result)
+
+            owners = {user.username: user.id for user in User.objects(
+                username__in=list({result["username"] for result in prepared if result["username"]})
+            ).only("username")}
+
+            # Recipes written by an earlier, interrupted run need no new upload
+            existing = {doc["_id"] for doc in recipes.find(
+                {"_id": {"$in": [result["recipe"]["_id"] for result in prepared]}}, {"_id": 1}
+            )}
+
+            to_write = []
+            for result in prepared:
+                owner_id = owners.get(result["username"], default_owner)
+                if owner_id is None:
+                    failed.append((result["line"], f"unknown user {result['username']!r} and no --owner given"))
+                elif result["recipe"]["_id"] in existing:
+                    skipped += 1
+                else:
+                    result["recipe"]["user"] = owner_id
+                    result["recipe"]["image"] = result["image"]["id"]
+                    to_write.append(result)
+
+            # Images first, so no recipe is ever visible without its image
+            list(uploads.map(
+                lambda result: _put_image(fs, result["image"], result["variants"], resumed),
+                to_write
+            ))
+            count, errors = _insert_unordered(recipes, [result["recipe"] for result in to_write])
+            inserted += count
+            for error in errors:
+                failed.append((to_write[error["index"]]["line"], error["errmsg"]))
+
+            if results:
+                checkpoint.lines_done = results[-1]["line"]
+                checkpoint.save()
+            resumed = False
+            click.echo(f"... line {checkpoint.lines_done}: {inserted} inserted, {skipped} already present, {len(failed)} failed")
+
+    for line_no, error in failed[:50]:
+        click.echo(f"line {line_no}: {error}", err=True)
+    if len(failed) > 50:
+        click.echo(f"... and {len(failed) - 50} more", err=True)
+
+    if inserted:
+        UserStats.rebuild()
+    click.echo(f"Imported {inserted} recipes ({skipped} already present, {len(failed)} failed)")
+
+
+@click.command("export-recipes")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.option("--images", "image_mode", type=click.Choice(["base64", "files", "none"]), default="base64", show_default=True)
+@click.option("--images-dir", type=click.Path(file_okay=False), help="Where --images=files writes [default: OUTPUT's directory/images]")
+@click.option("--batch-size", default=500, show_default=True, help="Cursor batch size and username lookup size")
+@click.option("--threads", default=8, show_default=True, help="Parallel GridFS reads")
+def export_recipes_command(output, image_mode, images_dir, batch_size, threads):
+    """Stream every recipe to a JSONL file that import-recipes can read back."""
+    base_dir = os.path.dirname(os.path.abspath(output))
+    images_dir = images_dir or os.path.join(base_dir, "images")
+    if image_mode == "files":
+        os.makedirs(images_dir, exist_ok=True)
+
+    fs = get_fs()
+    missing_images = []
+
+    def export_image(image_id):
+        if image_mode == "none" or not image_id:
+            return None
+        try:
+            grid_out = fs.get(image_id)
+        except NoFile:
+            # A dangling reference should not abort the export; the recipe goes out without its image
+            missing_images.append(image_id)
+            click.echo(f"image {image_id} is missing from GridFS; exporting its recipe without it", err=True)
+            return None
+        data = grid_out.read()
+        content_type = grid_out.content_type or "image/jpeg"
+        if image_mode == "base64":
+            return {"base64": base64.b64encode(data).decode("ascii"), "content_type": content_type}
+
+        path = os.path.join(images_dir, f"{image_id}.{IMAGE_EXTENSIONS.get(content_type, 'bin')}")
+        with open(path, "wb") as f:
+            f.write(data)
+        return {"path": os.path.relpath(path, base_dir), "content_type": content_type}
+
+    cursor = Recipe._get_collection().find(
+        {}, {"likedBy": 0, "likesCount": 0, "commentCount": 0, "ingredientTerms": 0}, batch_size=batch_size
+    ).sort("_id", 1)
+
+    exported = 0
+    with open(output, "w", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            chunk = list(itertools.islice(cursor, batch_size))
+            if not chunk:
+                break
+
+            usernames = load_usernames(doc.get("user") for doc in chunk)
+            images = pool.map(export_image, [doc.get("image") for doc in chunk])
+
+            for doc, image in zip(chunk, images):
+                record = {"id": str(doc["_id"])}
+                record.update({field: doc.get(field) for field in RECIPE_FIELDS})
+                created = doc.get("createdAt")
+                record["createdAt"] = created.isoformat() if created else None
+                record["user"] = usernames.get(doc.get("user"))
+                if image:
+                    record["image"] = image
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            exported += len(chunk)
+            click.echo(f"... {exported} recipes")
+
+    summary = f"Exported {exported} recipes to {output}"
+    if missing_images:
+        summary += f" ({len(missing_images)} without their missing image)"
+    click.echo(summary)
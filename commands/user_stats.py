@@ -0,0 +1,10 @@
+import click
+
+from models.user_stats import UserStats
+
+
+@click.command("rebuild-user-stats")
+def rebuild_user_stats_command():
+    """Recompute every user's recipe, like and comment counters behind /top-users."""
+    count = UserStats.rebuild()
+    click.echo(f"Rebuilt stats for {count} users")
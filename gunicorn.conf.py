@@ -0,0 +1,31 @@
+import os
+import shutil
+
+from dotenv import load_dotenv
+
+# gunicorn loads ./gunicorn.conf.py automatically, in the master and before the app.
+# Loading .env here lets the hooks below see PROMETHEUS_MULTIPROC_DIR too.
+load_dotenv()
+
+# Each open /my-notifications/stream holds a thread for as long as the client is connected,
+# so serve requests from a thread pool; a sync worker would be tied up by a single stream.
+# With gthread the timeout only applies to the worker's own heartbeat, not to a request,
+# so streams are not cut off after it; it still restarts a worker that stops responding.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+
+def on_starting(server):
+    # Stale samples from a previous run would be summed into /metrics
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (pool usage, queue depth) from the aggregate
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,7 @@
+from models.recipe import Recipe
+
+description = "Rename the legacy Recipe.favoriteCount field to likeCount"
+
+
+def up(ctx):
+    ctx.update_many(Recipe, {"favoriteCount": {"$exists": True}}, {"$rename": {"favoriteCount": "likeCount"}})
@@ -0,0 +1,11 @@
+from models.recipe import Recipe
+
+description = "Backfill Recipe.likesCount from likedBy and drop the superseded likeCount"
+
+
+def up(ctx):
+    # Computed server side from the document's own likedBy array
+    ctx.update_many(Recipe, {}, [
+        {"$set": {"likesCount": {"$size": {"$ifNull": ["$likedBy", []]}}}},
+        {"$project": {"likeCount": 0}},
+    ])
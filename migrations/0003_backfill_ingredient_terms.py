@@ -0,0 +1,21 @@
+from models.recipe import Recipe
+from utils.search import ingredient_terms
+
+description = "Backfill Recipe.ingredientTerms (normally set by Recipe.clean() on save)"
+
+
+def up(ctx):
+    # Term normalization only exists in Python, so this one goes through bulk_write
+    ctx.bulk_update(
+        Recipe,
+        {},
+        {"ingredients": 1, "ingredientTerms": 1},
+        _terms_update
+    )
+
+
+def _terms_update(doc):
+    terms = ingredient_terms(doc.get("ingredients"))
+    if terms == doc.get("ingredientTerms"):
+        return None
+    return {"$set": {"ingredientTerms": terms}}
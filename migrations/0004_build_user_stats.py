@@ -0,0 +1,9 @@
+from models.user_stats import UserStats
+
+description = "Build the UserStats counters behind /top-users"
+
+
+def up(ctx):
+    # Two $group aggregations and one bulk_write, all sized by the number of users
+    count = UserStats.rebuild()
+    ctx.echo(f"{ctx.name}: stats for {count} users")
@@ -0,0 +1,21 @@
+from models.comment import Comment
+from models.recipe import Recipe
+
+description = "Backfill the denormalized Recipe.commentCount"
+
+
+def up(ctx):
+    # One $group over comments (sized by the number of commented recipes), then batched writes;
+    # update pipelines cannot $lookup, so the counts are joined in Python
+    counts = {
+        row["_id"]: row["count"]
+        for row in Comment.objects.aggregate({"$group": {"_id": "$recipe", "count": {"$sum": 1}}})
+    }
+
+    def count_update(doc):
+        count = counts.get(doc["_id"], 0)
+        if doc.get("commentCount") == count:
+            return None
+        return {"$set": {"commentCount": count}}
+
+    ctx.bulk_update(Recipe, {}, {"commentCount": 1}, count_update)
@@ -0,0 +1,8 @@
+"""
+Versioned data migrations, applied in order by `flask --app app migrate`.
+
+Each NNNN_<name>.py module defines a one-line `description` and `up(ctx)`,
+where ctx is a utils.migrations.MigrationContext. Applied migrations are
+recorded in the migrations_applied collection. Write them so that running
+one again is harmless: a failed run is retried from the start.
+"""
@@ -2,12 +2,25 @@ import datetime
 
 from mongoengine import Document, StringField, DateTimeField
 
+# How long an issued JWT stays valid. A blacklist entry is useless once the
+# token it revokes has expired, so entries are dropped by a TTL index after this long.
+TOKEN_LIFETIME = datetime.timedelta(hours=2)
+
 class BlackList(Document):
     jti = StringField(required=True, unique=True, sparse = True)
     blacklisted_on = DateTimeField(default=datetime.datetime.utcnow)
 
+    meta = {
+        "indexes": [
+            {
+                "fields": ["blacklisted_on"],
+                "expireAfterSeconds": int(TOKEN_LIFETIME.total_seconds())
+            }
+        ]
+    }
+
     def to_dict(self):
         return {
             "jti": self.jti,
             "blacklisted_on": self.blacklisted_on.isoformat()
-        }
\ No newline at end of file
+        }
@@ -1,5 +1,6 @@
 from mongoengine import Document, StringField, ReferenceField, DateTimeField, CASCADE
 import datetime
+from utils.refs import ref_id
 
 class Comment(Document):
     user = ReferenceField("User", required = True)
@@ -7,11 +8,29 @@ class Comment(Document):
     body = StringField(required = True)
     time = DateTimeField(default=datetime.datetime.utcnow)
 
-    def to_dict(self):
+    # Moving a comment to another recipe would leave both recipes' commentCount wrong
+    READ_ONLY_FIELDS = ("recipe",)
+
+    meta = {
+        "indexes": [
+            ("recipe", "-time", "-id"),    # /recipes/<id>/comments, newest first
+            "user",                        # /my-comments
+        ]
+    }
+
+    def to_dict(self, usernames=None):
+        # usernames: optional {user_id: username} map prefetched for a whole page
+        if usernames is not None:
+            username = usernames.get(ref_id(self, "user"))
+        else:
+            username = self.user.username if self.user else None
+
+        recipe_id = ref_id(self, "recipe")
+
         return{
             "id": str(self.id),
-            "username": self.user.username if self.user else None,
-            "recipeId": str(self.recipe.id) if self.recipe else None,
+            "username": username,
+            "recipeId": str(recipe_id) if recipe_id else None,
             "body": self.body,
             "time": self.time.isoformat() if self.time else None,
         }
\ No newline at end of file
@@ -0,0 +1,14 @@
+import datetime
+
+from mongoengine import Document, StringField, DateTimeField, FloatField
+
+
+class AppliedMigration(Document):
+    """One row per migration in migrations/ that has run (or is running) against this database."""
+    name = StringField(required=True, unique=True)    # module name, e.g. "0002_backfill_likes_count"
+    state = StringField(required=True, choices=["running", "applied"], default="running")
+    startedAt = DateTimeField(default=datetime.datetime.utcnow)
+    appliedAt = DateTimeField()
+    durationSeconds = FloatField()
+
+    meta = {"collection": "migrations_applied"}
@@ -3,6 +3,7 @@ from mongoengine import (
 )
 
 import datetime
+from utils.refs import ref_id
 
 class Notification(Document):
     user = ReferenceField("User", required = True, reverse_delete_rule = 2)
@@ -19,15 +20,32 @@ class Notification(Document):
     createdAt= DateTimeField(required = True, default = datetime.datetime.utcnow)
     read= BooleanField(required = True, default = False) 
 
-    def to_dict(self):
+    meta = {
+        "indexes": [
+            ("user", "-createdAt", "-id"),     # /my-notifications, newest first
+            ("user", "read", "-createdAt"),    # unread filters and counts, unlike cleanup
+        ]
+    }
+
+    def to_dict(self, usernames=None):
+        # usernames: optional {user_id: username} map prefetched for a whole page
+        if usernames is not None:
+            actor_name = usernames.get(ref_id(self, "actor"))
+        else:
+            actor_name = self.actor.username if self.actor else None
+
+        user_id = ref_id(self, "user")
+        recipe_id = ref_id(self, "recipe")
+        comment_id = ref_id(self, "comment")
+
         return {
             "id" : str(self.id),
-            "userId": str(self.user.id) if self.user else None,
+            "userId": str(user_id) if user_id else None,
             "type": self.type,
-            "user": self.actor.username if self.actor else None,
+            "user": actor_name,
             "message": self.message,
-            "recipeId": str(self.recipe.id) if self.recipe else None,
+            "recipeId": str(recipe_id) if recipe_id else None,
             "createdAt": self.createdAt.isoformat() if self.createdAt else None,
             "read": self.read,
-            "commentId": str(self.comment.id) if self.comment else None
+            "commentId": str(comment_id) if comment_id else None
         }
\ No newline at end of file
@@ -3,7 +3,9 @@ from mongoengine import (
     Document, StringField, IntField, ListField, ReferenceField, FileField, DateTimeField
 )
 
-from flask import url_for
+from utils.refs import ref_id, ref_ids
+from utils.images import image_url, THUMBNAIL_WIDTH
+from utils.search import ingredient_terms
 
 class Recipe(Document):
     name = StringField(required = True)
@@ -18,21 +20,84 @@ class Recipe(Document):
     directions = ListField(StringField(), required = True)
     tags = ListField(StringField(), required = True)
     category = ListField(StringField(), required = True)
+    # Normalized ingredient keywords, derived from ingredients in clean() for ingredient search
+    ingredientTerms = ListField(StringField())
 
     user = ReferenceField("User", required=True)
 
     likedBy = ListField(ReferenceField("User"))
+    # Denormalized len(likedBy), kept in sync with $inc by toggle_like
+    likesCount = IntField(default=0)
+    # Denormalized comment count, kept in sync with $inc when comments are created and deleted
+    commentCount = IntField(default=0)
 
-    def to_dict(self):
-        image_url = None
+    meta = {
+        "indexes": [
+            "cookTime",                        # /recipes/quick-meals
+            "user",                            # /users/<id>/recipes, /my-recipes
+            "-createdAt",                      # newest first, popular ?window=
+            ("-likesCount", "-createdAt"),     # /recipes/popular
+            "ingredientTerms",                 # /recipes/search?ingredients=
+            {                                  # /recipes/search?q=
+                "fields": ["$title", "$name", "$tags", "$category", "$ingredients"],
+                "default_language": "english",
+                "weights": {"title": 10, "name": 8, "tags": 5, "category": 5, "ingredients": 2}
+            },
+        ]
+    }
+
+    # to_dict() key -> model field it is rendered from, for ?fields= projections
+    FIELD_SOURCES = {
+        "id": "id",
+        "name": "name",
+        "image": "image",
+        "thumbnail": "image",
+        "title": "title",
+        "prepTime": "prepTime",
+        "cookTime": "cookTime",
+        "servings": "servings",
+        "ingredients": "ingredients",
+        "directions": "directions",
+        "tags": "tags",
+        "category": "category",
+        "userID": "user",
+        "likesCount": "likesCount",
+        "commentCount": "commentCount",
+        "createdAt": "createdAt",
+        "likedBy": "likedBy",
+    }
+    # Named ?view= field sets; "full" (no projection) is the default
+    VIEWS = {
+        "summary": (
+            "id", "name", "title", "image", "thumbnail", "prepTime", "cookTime",
+            "servings", "tags", "category", "userID", "likesCount", "commentCount",
+            "createdAt",
+        ),
+    }
+    # Only changed by the atomic like/comment updates and clean(); update_document_fields refuses them
+    READ_ONLY_FIELDS = ("likedBy", "likesCount", "commentCount", "ingredientTerms")
+
+    def clean(self):
+        # Runs on every save(), so the search terms always follow the ingredients
+        self.ingredientTerms = ingredient_terms(self.ingredients)
+
+    def to_dict(self, fields=None):
+        # fields: optional set of output keys to keep (see FIELD_SOURCES)
+        original_url = thumbnail_url = None
         if self.image and self.image.grid_id:
-            image_url = url_for("images.serve_image", image_id=str(self.image.grid_id), _external=True)
+            original_url = image_url(self.image.grid_id)
+            # Card-sized variant for list pages; serve_image falls back to the original if none was stored
+            thumbnail_url = image_url(self.image.grid_id, width=THUMBNAIL_WIDTH)
 
+        # Read reference ids straight from the stored DBRefs so serializing never dereferences
+        user_id = ref_id(self, "user")
+        liked_by = ref_ids(self, "likedBy")
 
-        return{
+        data = {
             "id": str(self.id),
             "name": self.name,
-            "image": image_url,
+            "image": original_url,
+            "thumbnail": thumbnail_url,
             "title": self.title,
             "prepTime": self.prepTime,
             "cookTime": self.cookTime,
@@ -41,9 +106,14 @@ class Recipe(Document):
             "directions": self.directions,
             "tags": self.tags,
             "category": self.category,
-            "userID": str(self.user.id) if self.user else None,
-            "likesCount": len(self.likedBy),
-            "createdAt":self.createdAt,
-            "likedBy": [str(u.id) for u in self.likedBy] if self.likedBy else []
+            "userID": str(user_id) if user_id else None,
+            "likesCount": self.likesCount,
+            "commentCount": self.commentCount,
+            "createdAt": self.createdAt.isoformat() if self.createdAt else None,
+            "likedBy": [str(u) for u in liked_by]
         }
+
+        if fields is not None:
+            data = {key: value for key, value in data.items() if key in fields}
+        return data
     
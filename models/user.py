@@ -1,7 +1,7 @@
 from mongoengine import Document, StringField, EmailField, ListField, ReferenceField, PULL
 from flask_bcrypt import generate_password_hash, check_password_hash
 from .recipe import Recipe  # import the Recipe model for reference
-from flask import url_for
+from utils.images import image_url, AVATAR_WIDTH
 import os
 
 DEFAULT_PROFILE_PICTURE_ID = os.getenv("DEFAULT_PROFILE_PIC_ID") 
@@ -33,18 +33,23 @@ class User(Document):
     def to_dict(self):
         # If the user has a non-default uploaded profile picture
         if self.profile_picture_id and str(self.profile_picture_id) != str(DEFAULT_PROFILE_PICTURE_ID):
-            profile_pic_url = url_for("images.serve_image", image_id=self.profile_picture_id, _external=True)
+            picture_id = self.profile_picture_id
         # Otherwise, fallback to default profile picture
         elif DEFAULT_PROFILE_PICTURE_ID:
-            profile_pic_url = url_for("images.serve_image", image_id=DEFAULT_PROFILE_PICTURE_ID, _external=True)
+            picture_id = DEFAULT_PROFILE_PICTURE_ID
         else:
-            profile_pic_url = None  # optional fallback if no default is configured
+            picture_id = None  # optional fallback if no default is configured
+
+        # profile_pic is the avatar-sized variant; serve_image falls back to the original if none was stored
+        profile_pic_url = image_url(picture_id, width=AVATAR_WIDTH) if picture_id else None
+        profile_pic_original_url = image_url(picture_id) if picture_id else None
 
         return {
             "id": str(self.id),
             "username": self.username,
             "email": self.email,
             "profile_pic": profile_pic_url,
+            "profile_pic_original": profile_pic_original_url,
         }
 
 
@@ -0,0 +1,62 @@
+from mongoengine import Document, ReferenceField, IntField, CASCADE
+from pymongo import ReplaceOne
+
+
+class UserStats(Document):
+    """
+    Per-user counters behind /top-users, kept up to date with $inc as recipes,
+    likes and comments come and go. `flask rebuild-user-stats` recomputes them
+    from the source collections if they ever drift.
+    """
+    user = ReferenceField("User", required=True, unique=True, reverse_delete_rule=CASCADE)
+
+    recipeCount = IntField(default=0)      # recipes the user has posted
+    likesReceived = IntField(default=0)    # likes across those recipes
+    commentCount = IntField(default=0)     # comments the user has written
+
+    meta = {
+        "collection": "user_stats",
+        "indexes": [
+            ("-recipeCount", "-likesReceived"),    # /top-users
+        ]
+    }
+
+    @classmethod
+    def bump(cls, user_id, **deltas):
+        """Atomically add deltas (e.g. recipeCount=1, likesReceived=-3) to a user's counters, creating them if needed."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if user_id is None or not deltas:
+            return
+        cls.objects(user=user_id).update_one(
+            upsert=True,
+            **{f"inc__{field}": delta for field, delta in deltas.items()}
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every user's counters from Recipe and Comment. Returns the number of users with stats."""
+        from models.recipe import Recipe
+        from models.comment import Comment
+
+        stats = {}
+
+        def entry(user_id):
+            return stats.setdefault(user_id, {"recipeCount": 0, "likesReceived": 0, "commentCount": 0})
+
+        for row in Recipe.objects.aggregate(
+            {"$group": {"_id": "$user", "recipes": {"$sum": 1}, "likes": {"$sum": {"$ifNull": ["$likesCount", 0]}}}}
+        ):
+            entry(row["_id"]).update(recipeCount=row["recipes"], likesReceived=row["likes"])
+
+        for row in Comment.objects.aggregate({"$group": {"_id": "$user", "comments": {"$sum": 1}}}):
+            entry(row["_id"])["commentCount"] = row["comments"]
+
+        stats.pop(None, None)
+        collection = cls._get_collection()
+        if stats:
+            collection.bulk_write([
+                ReplaceOne({"user": user_id}, {"user": user_id, **counters}, upsert=True)
+                for user_id, counters in stats.items()
+            ], ordered=False)
+        collection.delete_many({"user": {"$nin": list(stats)}})
+        return len(stats)
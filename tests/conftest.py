@@ -0,0 +1,82 @@
+import datetime
+import io
+import os
+import uuid
+
+import jwt
+import mongomock
+import mongomock.gridfs
+from mongomock.collection import BulkOperationBuilder
+import pytest
+from mongoengine import connect, disconnect
+from PIL import Image
+
+# Set before the app loads .env, so tests never point at the real cluster
+os.environ["MONGODB_URI"] = "mongodb://localhost:27017/recipehub_test"
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-enough-bytes-for-hs256")
+
+import utils.db
+from app import create_app
+
+mongomock.gridfs.enable_gridfs_integration()
+
+
+def _without_sort(add):
+    # pymongo >= 4.9 passes sort= to the bulk builder, which mongomock 4.3 does not accept yet
+    def wrapper(self, *args, sort=None, **kwargs):
+        assert sort is None, "mongomock cannot sort bulk updates"
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+BulkOperationBuilder.add_update = _without_sort(BulkOperationBuilder.add_update)
+BulkOperationBuilder.add_replace = _without_sort(BulkOperationBuilder.add_replace)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = create_app()
+    # Swap the registered Atlas connection for an in-memory one
+    disconnect("default")
+    connect("recipehub_test", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient, alias="default")
+    # get_fs() caches its handle per process; make it pick up this test's database
+    monkeypatch.setattr(utils.db, "_fs", None)
+    yield app
+    disconnect("default")
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    def make(user_id):
+        token = jwt.encode({
+            "user_id": str(user_id),
+            "jti": str(uuid.uuid4()),
+            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        }, app.config["SECRET_KEY"], algorithm="HS256")
+        return {"Authorization": f"Bearer {token}"}
+    return make
+
+
+def jpeg(width=1200, height=900):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def create_recipe(client):
+    """create_recipe(headers) -> id of a new recipe posted through the API as that user."""
+    def make(headers):
+        response = client.post("/recipes", headers=headers, content_type="multipart/form-data", data={
+            "name": "soup", "title": "Tomato soup", "prepTime": "5", "cookTime": "10", "servings": "2",
+            "ingredients": '["2 tomatoes"]', "directions": '["cook"]', "tags": '["soup"]', "category": '["dinner"]',
+            "image": (io.BytesIO(jpeg()), "soup.jpg", "image/jpeg"),
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["data"]["id"]
+    return make
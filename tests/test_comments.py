@@ -0,0 +1,34 @@
+import pytest
+
+from models.recipe import Recipe
+from models.user import User
+from utils.crud_utils import update_document_fields
+
+
+def post_comment(client, headers, recipe_id):
+    response = client.post("/comments", headers=headers, json={"recipe": recipe_id, "body": "Tasty"})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["id"]
+
+
+def test_comment_count_is_read_only(app, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    recipe = Recipe.objects.get(id=create_recipe(auth_headers(user.id)))
+
+    with pytest.raises(ValueError):
+        update_document_fields(recipe, {"commentCount": 555})
+
+    assert Recipe.objects.get(id=recipe.id).commentCount == 0
+
+
+def test_comments_cannot_move_to_another_recipe(client, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    first, second = create_recipe(headers), create_recipe(headers)
+    comment_id = post_comment(client, headers, first)
+
+    response = client.patch(f"/comments/{comment_id}", headers=headers, json={"recipe": second})
+
+    assert response.status_code == 400
+    assert client.get(f"/recipes/{first}/comments", headers=headers).get_json()["data"][0]["id"] == comment_id
+    assert [Recipe.objects.get(id=recipe_id).commentCount for recipe_id in (first, second)] == [1, 0]
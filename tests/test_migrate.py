@@ -0,0 +1,43 @@
+import datetime
+import types
+
+import pytest
+
+from models.migration import AppliedMigration
+
+
+@pytest.fixture
+def migrations(monkeypatch):
+    """Replace migrations/ with one recording migration."""
+    calls = []
+    module = types.SimpleNamespace(description="Test migration", up=lambda ctx: calls.append(ctx.name))
+    monkeypatch.setattr("commands.migrate.discover", lambda: [("0001_test", module)])
+    return calls
+
+
+def test_applies_pending_migrations(app, migrations):
+    result = app.test_cli_runner().invoke(args=["migrate"])
+
+    assert result.exit_code == 0, result.output
+    assert migrations == ["0001_test"]
+    assert AppliedMigration.objects.get(name="0001_test").state == "applied"
+
+
+def test_stale_running_record_is_not_treated_as_applied(app, migrations):
+    AppliedMigration(name="0001_test", startedAt=datetime.datetime(2024, 1, 1)).save()
+
+    result = app.test_cli_runner().invoke(args=["migrate"])
+
+    assert result.exit_code != 0
+    assert "--force-unlock" in result.output
+    assert migrations == []
+
+
+def test_force_unlock_takes_over_a_stale_running_record(app, migrations):
+    AppliedMigration(name="0001_test", startedAt=datetime.datetime(2024, 1, 1)).save()
+
+    result = app.test_cli_runner().invoke(args=["migrate", "--force-unlock"])
+
+    assert result.exit_code == 0, result.output
+    assert migrations == ["0001_test"]
+    assert AppliedMigration.objects.get(name="0001_test").state == "applied"
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from models.notification import Notification
+from models.user import User
+from utils.notification_queue import NotificationQueue
+
+
+@pytest.fixture
+def queue(app):
+    queue = NotificationQueue(batch_window=0, max_attempts=3)
+    # Flush by hand instead of from the worker thread
+    queue._worker_pid = os.getpid()
+    return queue
+
+
+@pytest.fixture
+def failing_inserts(monkeypatch):
+    """Make the next `count` insert_many calls raise."""
+    collection_class = type(Notification._get_collection())
+    insert_many = collection_class.insert_many
+    remaining = {"count": 0}
+
+    def flaky_insert_many(self, *args, **kwargs):
+        if remaining["count"]:
+            remaining["count"] -= 1
+            raise AutoReconnect("connection reset")
+        return insert_many(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_class, "insert_many", flaky_insert_many)
+    return remaining
+
+
+@pytest.fixture
+def users(app):
+    return User.create("alice@example.com", "alice", "password"), User.create("bob@example.com", "bob", "password")
+
+
+def enqueue(queue, users):
+    owner, actor = users
+    notification = Notification(
+        user=owner, actor=actor, recipe=ObjectId(), type="favorite", message="bob liked your recipe"
+    )
+    queue.enqueue_create(("favorite", ObjectId()), notification, actor=actor)
+    return notification
+
+
+def test_failed_insert_is_retried(queue, users, failing_inserts):
+    failing_inserts["count"] = 1
+    enqueue(queue, users)
+
+    queue.flush()
+    assert Notification.objects.count() == 0
+    assert queue.stats()["depth"] == 1
+
+    queue.flush(include_retries=True)
+    assert Notification.objects.count() == 1
+    assert queue.stats()["retried"] == 1
+    assert queue.stats()["failed"] == 0
+
+
+def test_failures_are_counted_per_operation_once_out_of_attempts(queue, users, failing_inserts):
+    failing_inserts["count"] = 3
+    enqueue(queue, users)
+    enqueue(queue, users)
+
+    for _ in range(3):
+        queue.flush(include_retries=True)
+
+    assert Notification.objects.count() == 0
+    assert queue.stats()["depth"] == 0
+    assert queue.stats()["failed"] == 2
+
+
+def test_insert_that_already_landed_counts_as_written(queue, users):
+    notification = enqueue(queue, users)
+    Notification._get_collection().insert_one(notification.to_mongo())
+
+    queue.flush()
+
+    assert Notification.objects.count() == 1
+    assert queue.stats()["inserted"] == 1
+    assert queue.stats()["depth"] == 0
@@ -0,0 +1,78 @@
+import datetime
+
+from bson import ObjectId
+
+from models.notification import Notification
+from models.user import User
+
+
+def insert_notifications(user, count):
+    start = datetime.datetime(2025, 1, 1)
+    Notification._get_collection().insert_many([
+        Notification(user=user.id, actor=user.id, recipe=ObjectId(), type="favorite", message=f"n{i}",
+                     createdAt=start + datetime.timedelta(minutes=i)).to_mongo()
+        for i in range(count)
+    ])
+
+
+def test_my_notifications_pages_newest_first(client, auth_headers):
+    user = User.create("alice@example.com", "alice", "password")
+    insert_notifications(user, 5)
+    headers = auth_headers(user.id)
+
+    messages, after = [], None
+    while True:
+        response = client.get("/my-notifications?limit=2" + (f"&after={after}" if after else ""), headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        messages += [notification["message"] for notification in body["data"]]
+        after = body["next_cursor"]
+        if not after:
+            break
+
+    assert messages == ["n4", "n3", "n2", "n1", "n0"]
+
+
+def stream_token(client, headers):
+    response = client.post("/my-notifications/stream-token", headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["token"]
+
+
+def test_stream_accepts_a_query_token_for_eventsource(client, auth_headers):
+    user = User.create("alice@example.com", "alice", "password")
+    token = stream_token(client, auth_headers(user.id))
+
+    response = client.get(f"/my-notifications/stream?token={token}", buffered=False)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert next(iter(response.response)).startswith(b"retry:")
+    response.close()
+
+
+def test_stream_requires_a_token(client):
+    assert client.get("/my-notifications/stream").status_code == 401
+
+
+def test_stream_token_is_not_a_session_token(client, auth_headers):
+    user = User.create("alice@example.com", "alice", "password")
+    token = stream_token(client, auth_headers(user.id))
+
+    response = client.get("/my-notifications", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
+
+
+def test_open_stream_ends_when_the_session_signs_out(client, auth_headers, monkeypatch):
+    monkeypatch.setattr("apis.notifications.STREAM_HEARTBEAT_SECONDS", 0.01)
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    token = stream_token(client, headers)
+    events = iter(client.get(f"/my-notifications/stream?token={token}", buffered=False).response)
+    assert next(events).startswith(b"retry:")
+
+    assert client.post("/signout", headers=headers).status_code == 200
+
+    assert next(events).startswith(b"event: end")
+    assert client.get(f"/my-notifications/stream?token={token}").status_code == 401
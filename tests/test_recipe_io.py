@@ -0,0 +1,111 @@
+import json
+
+from mongoengine import get_db
+
+import commands.recipe_io
+from models.recipe import Recipe
+from models.user import User
+from models.user_stats import UserStats
+
+
+def run(app, *args):
+    # One validation process keeps the spawn start-up cost down
+    if args[0] == "import-recipes":
+        args += ("--workers", "1")
+    return app.test_cli_runner().invoke(args=list(args))
+
+
+def write_jsonl(path, recipes):
+    path.write_text("".join(json.dumps(recipe) + "\n" for recipe in recipes))
+    return str(path)
+
+
+def test_export_and_import_round_trip(app, tmp_path, auth_headers, create_recipe):
+    alice = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(alice.id)
+    recipe_ids = [create_recipe(headers) for _ in range(2)]
+    backup = str(tmp_path / "backup.jsonl")
+
+    result = run(app, "export-recipes", backup, "--images", "files")
+    assert result.exit_code == 0, result.output
+
+    get_db()["recipe"].delete_many({})
+    get_db()["user_stats"].delete_many({})
+    result = run(app, "import-recipes", backup)
+
+    assert result.exit_code == 0, result.output
+    assert "Imported 2 recipes" in result.output
+    assert sorted(str(recipe.id) for recipe in Recipe.objects) == sorted(recipe_ids)
+    recipe = Recipe.objects.first()
+    assert recipe.title == "Tomato soup" and recipe.ingredientTerms
+    assert recipe.image.read()
+    assert UserStats.objects.get(user=alice.id).recipeCount == 2
+
+
+def test_export_skips_missing_images(app, tmp_path, auth_headers, create_recipe):
+    alice = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(alice.id)
+    dangling, intact = create_recipe(headers), create_recipe(headers)
+    get_db()["fs.files"].delete_one({"_id": Recipe.objects.get(id=dangling).image.grid_id})
+    backup = tmp_path / "backup.jsonl"
+
+    result = run(app, "export-recipes", str(backup))
+
+    assert result.exit_code == 0, result.output
+    assert "1 without their missing image" in result.output
+    records = {record["id"]: record for record in map(json.loads, backup.read_text().splitlines())}
+    assert "image" not in records[dangling]
+    assert records[intact]["image"]["base64"]
+
+
+def test_reimport_skips_recipes_already_present(app, tmp_path, auth_headers, create_recipe):
+    alice = User.create("alice@example.com", "alice", "password")
+    create_recipe(auth_headers(alice.id))
+    backup = str(tmp_path / "backup.jsonl")
+    assert run(app, "export-recipes", backup).exit_code == 0
+    # Without ids, the import derives them from the line and the checkpoint's start time
+    source = write_jsonl(tmp_path / "source.jsonl", [
+        {**record, "id": None, "title": f"Soup {i}"}
+        for i, record in enumerate(map(json.loads, open(backup).read().splitlines() * 3))
+    ])
+
+    assert run(app, "import-recipes", source).exit_code == 0
+    result = run(app, "import-recipes", source, "--restart")
+
+    assert result.exit_code == 0, result.output
+    assert "Imported 0 recipes (3 already present, 0 failed)" in result.output
+    assert Recipe.objects.count() == 4
+
+
+def test_import_resumes_from_the_checkpoint(app, tmp_path, auth_headers, create_recipe, monkeypatch):
+    alice = User.create("alice@example.com", "alice", "password")
+    create_recipe(auth_headers(alice.id))
+    backup = str(tmp_path / "backup.jsonl")
+    assert run(app, "export-recipes", backup).exit_code == 0
+    source = write_jsonl(tmp_path / "source.jsonl", [
+        {**record, "id": None, "title": f"Soup {i}"}
+        for i, record in enumerate(map(json.loads, open(backup).read().splitlines() * 3))
+    ])
+
+    # The second batch's write fails, as if the database went away mid-import
+    insert_unordered = commands.recipe_io._insert_unordered
+    batches = []
+
+    def failing_insert(collection, documents):
+        batches.append(documents)
+        if len(batches) == 2:
+            raise RuntimeError("connection lost")
+        return insert_unordered(collection, documents)
+
+    monkeypatch.setattr(commands.recipe_io, "_insert_unordered", failing_insert)
+    result = run(app, "import-recipes", source, "--batch-size", "1")
+    assert result.exit_code != 0
+    assert json.load(open(f"{source}.checkpoint"))["lines_done"] == 1
+
+    monkeypatch.setattr(commands.recipe_io, "_insert_unordered", insert_unordered)
+    result = run(app, "import-recipes", source, "--batch-size", "1")
+
+    assert result.exit_code == 0, result.output
+    assert "Resuming after line 1" in result.output
+    assert "Imported 2 recipes" in result.output
+    assert sorted(recipe.title for recipe in Recipe.objects) == ["Soup 0", "Soup 1", "Soup 2", "Tomato soup"]
@@ -0,0 +1,83 @@
+from mongoengine import get_db
+from mongoengine.queryset import QuerySet
+
+from models.recipe import Recipe
+from models.user import User
+from models.user_stats import UserStats
+
+
+def test_deleting_a_recipe_removes_its_image_and_variants(client, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    recipe_id = create_recipe(headers)
+    assert get_db()["fs.files"].count_documents({"variantOf": {"$exists": True}}) > 0
+
+    response = client.delete(f"/recipes/{recipe_id}", headers=headers)
+
+    assert response.status_code == 200, response.get_json()
+    assert get_db()["fs.files"].count_documents({}) == 0
+
+
+def test_like_that_loses_a_race_reports_the_current_state(client, auth_headers, create_recipe, monkeypatch):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    recipe_id = create_recipe(headers)
+
+    # A concurrent like lands between toggle_like's "unlike if liked" and "like if not liked" updates
+    modify = QuerySet.modify
+    calls = []
+
+    def racing_modify(self, *args, **kwargs):
+        result = modify(self, *args, **kwargs)
+        if not calls:
+            Recipe.objects(id=recipe_id).update_one(add_to_set__likedBy=user, inc__likesCount=1)
+        calls.append(result)
+        return result
+
+    monkeypatch.setattr(QuerySet, "modify", racing_modify)
+    response = client.post(f"/recipes/{recipe_id}/like", headers=headers)
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["liked"] is True
+    assert response.get_json()["likeCount"] == 1
+
+
+def test_deleted_recipe_leaves_the_popular_list(client, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    recipe_id = create_recipe(headers)
+    client.post(f"/recipes/{recipe_id}/like", headers=headers)
+    assert [r["id"] for r in client.get("/recipes/popular", headers=headers).get_json()["data"]] == [recipe_id]
+
+    client.delete(f"/recipes/{recipe_id}", headers=headers)
+
+    assert client.get("/recipes/popular", headers=headers).get_json()["data"] == []
+
+
+def test_recipes_have_no_generic_patch_route(client, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    recipe_id = create_recipe(headers)
+
+    response = client.patch(f"/recipes/{recipe_id}", headers=headers, json={"title": "Stew"})
+
+    assert response.status_code == 405
+    assert Recipe.objects.get(id=recipe_id).title == "Tomato soup"
+
+
+def test_like_counters_only_change_through_likes(client, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    recipe_id = create_recipe(headers)
+    client.post(f"/recipes/{recipe_id}/like", headers=headers)
+
+    response = client.patch(f"/recipes/{recipe_id}", headers=headers, json={"likesCount": 100000})
+
+    assert response.status_code in (400, 405)
+    assert Recipe.objects.get(id=recipe_id).likesCount == 1
+    assert UserStats.objects.get(user=user.id).likesReceived == 1
+    assert client.get("/recipes/popular", headers=headers).get_json()["data"][0]["likesCount"] == 1
+
+    client.delete(f"/recipes/{recipe_id}", headers=headers)
+
+    assert UserStats.objects.get(user=user.id).likesReceived == 0
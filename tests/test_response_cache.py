@@ -0,0 +1,27 @@
+from prometheus_client import REGISTRY
+
+from models.user import User
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_cached_lookups_are_counted_once(client, auth_headers, create_recipe):
+    user = User.create("alice@example.com", "alice", "password")
+    headers = auth_headers(user.id)
+    recipe_id = create_recipe(headers)
+    before = {
+        result: (sample("recipehub_cache_requests_total", cache="responses", result=result),
+                 sample("recipehub_response_cache_requests_total", endpoint="recipes.user", result=result))
+        for result in ("hit", "miss")
+    }
+
+    for _ in range(2):
+        assert client.get(f"/recipes/{recipe_id}/user", headers=headers).status_code == 200
+
+    for result in ("hit", "miss"):
+        cache_before, endpoint_before = before[result]
+        assert sample("recipehub_cache_requests_total", cache="responses", result=result) == cache_before
+        assert sample("recipehub_response_cache_requests_total", endpoint="recipes.user", result=result) \
+            == endpoint_before + 1
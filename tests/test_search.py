@@ -0,0 +1,53 @@
+from bson import ObjectId
+from mongoengine.queryset import QuerySet
+
+from models.recipe import Recipe
+from utils.search import ingredient_terms
+
+
+def insert_recipe(title, ingredients):
+    recipe = Recipe(
+        id=ObjectId(), name=title, title=title, prepTime=5, cookTime=10, servings=2,
+        ingredients=ingredients, ingredientTerms=ingredient_terms(ingredients),
+        directions=["cook"], tags=["test"], category=["dinner"], user=ObjectId(),
+    ).to_mongo()
+    recipe["image"] = ObjectId()
+    Recipe._get_collection().insert_one(recipe)
+    return recipe["_id"]
+
+
+def test_ingredient_search_returns_recipes_in_ranked_order(client, auth_headers, monkeypatch):
+    soup = insert_recipe("Soup", ["salt", "pepper", "water"])
+    steak = insert_recipe("Steak", ["salt", "pepper"])
+
+    # mongomock has no $setDifference/$setIntersection, so stand in for the ranking stage
+    pipelines = []
+
+    def aggregate(self, *pipeline, **kwargs):
+        pipelines.append(pipeline)
+        return iter([{"_id": steak}, {"_id": soup}])
+
+    monkeypatch.setattr(QuerySet, "aggregate", aggregate)
+
+    response = client.get("/recipes/search?ingredients=salt,pepper", headers=auth_headers(ObjectId()))
+
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert [recipe["title"] for recipe in body["data"]] == ["Steak", "Soup"]
+    assert body["next_cursor"] is None
+    assert sorted(pipelines[0][0]["$match"]["ingredientTerms"]["$in"]) == ["pepper", "salt"]
+
+
+def test_search_with_fields_projects_the_page(client, auth_headers, monkeypatch):
+    steak = insert_recipe("Steak", ["salt", "pepper"])
+    monkeypatch.setattr(QuerySet, "aggregate", lambda self, *pipeline, **kwargs: iter([{"_id": steak}]))
+
+    response = client.get("/recipes/search?ingredients=salt&fields=title", headers=auth_headers(ObjectId()))
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["data"] == [{"id": str(steak), "title": "Steak"}]
+
+
+def test_search_requires_a_query(client, auth_headers):
+    response = client.get("/recipes/search", headers=auth_headers(ObjectId()))
+    assert response.status_code == 400
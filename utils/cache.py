@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import CACHE_REQUESTS, CACHE_EVICTIONS
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with a per-entry TTL and LRU eviction.
+
+    Each gunicorn worker has its own copy, so entries must be safe to serve
+    slightly stale for up to `ttl` seconds after a write in another worker.
+
+    Hits and misses go to the cache metrics under `name`; pass
+    count_requests=False when the caller already counts its own lookups.
+    """
+
+    def __init__(self, ttl, maxsize=128, name="default", count_requests=True):
+        self.name = name
+        self.count_requests = count_requests
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                if self.count_requests:
+                    CACHE_REQUESTS.labels(self.name, "miss").inc()
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            if self.count_requests:
+                CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                CACHE_EVICTIONS.labels(self.name).inc()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -1,8 +1,13 @@
 from flask import Blueprint, jsonify, request
-from utils.crud_utils import get_document_or_404, update_document_fields
+from utils.crud_utils import (
+    get_document_or_404, update_document_fields, paginate_queryset, paginate_newest_first, parse_fields, project
+)
+from utils.serializers import serialize_many
+from utils.refs import ref_id
+from utils.response_cache import response_cache
 from mongoengine import ReferenceField, ValidationError
 
-def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user_owned=False, allow_cross_user_create=False, exclude_methods=None):
+def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user_owned=False, allow_cross_user_create=False, exclude_methods=None, on_delete=None, after_delete=None, cached=False, newest_first=None):
     """
     CRUD Factory with JWT support and user ownership
 
@@ -13,6 +18,19 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
         required_fields: list of required fields for creation
         user_owned: requires user ownership check for write operations
         allow_cross_user_create: if True, users can create documents referencing other users' content
+        on_delete: optional callable(doc) run just before DELETE removes a document, while
+            anything that cascades from it still exists (e.g. to adjust denormalized counters)
+        after_delete: optional callable(doc) run once DELETE has removed the document
+            (e.g. to clear caches a concurrent read could otherwise refill with it)
+        cached: serve GET /<endpoint>/<id> through the response cache; PATCH and DELETE
+            invalidate by document id either way
+        newest_first: optional date field; GET /my-<endpoint> then pages newest first on
+            (field, _id) instead of oldest first on _id
+
+    List endpoints (GET /<endpoint> and GET /my-<endpoint>) are keyset-paginated on _id:
+    pass ?limit= (default 20, max 100) and ?after=<next_cursor from the previous page>.
+    GET endpoints of models that declare FIELD_SOURCES also take ?fields=a,b or ?view=<name>
+    to project the response (and the MongoDB query) down to those fields.
     """
     
     # Helper function to check ownership for write operations
@@ -21,8 +39,8 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
         if not (user_owned and hasattr(request, 'user_id')):
             return True  
 
-        if hasattr(doc, 'user') and hasattr(doc.user, 'id'):
-            return str(doc.user.id) == request.user_id
+        if hasattr(doc, 'user') and ref_id(doc, 'user'):
+            return str(ref_id(doc, 'user')) == request.user_id
 
         elif hasattr(doc, 'user_id'):
             return str(doc.user_id) == request.user_id
@@ -56,40 +74,57 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
     if "GET" not in exclude_methods:
         @bp.route(f"/{endpoint}", methods=["GET"])
         def get_all():
-            docs = model.objects()
-            
+            fields, err, code = parse_fields(model)
+            if err:
+                return jsonify(err), code
+
+            page, err, code = paginate_queryset(project(model.objects(), model, fields))
+            if err:
+                return jsonify(err), code
+
+            docs = page["docs"]
             if not docs:
                 return jsonify({
                     "message": f"No {endpoint} found",
-                    "data": []
+                    "data": [],
+                    "next_cursor": None
                 }), 200
             
-            result = []
-            for doc in docs:
-                doc_dict = doc.to_dict()
-                if hasattr(request, 'user_id'):
+            result = serialize_many(model, docs, fields=fields)
+            if hasattr(request, 'user_id'):
+                for doc, doc_dict in zip(docs, result):
                     doc_dict['is_owner'] = check_ownership(doc)
-                result.append(doc_dict)
             
             return jsonify({
                 "message": f"Found {len(result)} {endpoint}",
-                "data": result
+                "data": result,
+                "next_cursor": page["next_cursor"]
             }), 200
 
         # GET one 
-        @bp.route(f"/{endpoint}/<doc_id>", methods=["GET"])
         def get_one(doc_id):
-            doc, err, code = get_document_or_404(model, doc_id, f"{endpoint[:-1].capitalize()} not found")
+            fields, err, code = parse_fields(model)
+            if err:
+                return jsonify(err), code
+
+            doc, err, code = get_document_or_404(model, doc_id, f"{endpoint[:-1].capitalize()} not found", fields=fields)
             if err:
                 return jsonify(err), code
             
-            doc_dict = doc.to_dict()
+            doc_dict = doc.to_dict(fields=fields) if fields is not None else doc.to_dict()
             
             if hasattr(request, 'user_id'):
                 doc_dict['is_owner'] = check_ownership(doc)
                 
             return jsonify(doc_dict), 200
 
+        if cached:
+            # is_owner differs per user, so owned documents are cached per user
+            get_one = response_cache.cached(
+                f"{endpoint}.get_one", tags=lambda doc_id: [doc_id], vary_user=user_owned
+            )(get_one)
+        bp.add_url_rule(f"/{endpoint}/<doc_id>", view_func=get_one, methods=["GET"])
+
         # GET user's own documents only
         @bp.route(f"/my-{endpoint}", methods=["GET"])
         def get_my_documents():
@@ -97,20 +132,35 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
                 return jsonify({"error": "Authentication required"}), 401
                 
             if hasattr(model, 'user'):  
-                docs = model.objects(user=request.user_id)
+                queryset = model.objects(user=request.user_id)
             else:  
-                docs = model.objects(user_id=request.user_id)
-            
+                queryset = model.objects(user_id=request.user_id)
+
+            fields, err, code = parse_fields(model)
+            if err:
+                return jsonify(err), code
+
+            queryset = project(queryset, model, fields)
+            if newest_first:
+                page, err, code = paginate_newest_first(queryset, newest_first)
+            else:
+                page, err, code = paginate_queryset(queryset)
+            if err:
+                return jsonify(err), code
+
+            docs = page["docs"]
             if not docs:
                 return jsonify({
                     "message": f"You have no {endpoint} yet",
-                    "data": []
+                    "data": [],
+                    "next_cursor": None
                 }), 200
             
-            result = [doc.to_dict() for doc in docs]
+            result = serialize_many(model, docs, fields=fields)
             return jsonify({
                 "message": f"Found {len(result)} of your {endpoint}",
-                "data": result
+                "data": result,
+                "next_cursor": page["next_cursor"]
             }), 200
 
     # --- CREATE ---
@@ -146,8 +196,8 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
             except Exception as e:
                 return jsonify({"error": str(e)}), 400
 
-    # --- PATCH ---
-    if "UPDATE" not in exclude_methods:
+    # --- PATCH --- ("UPDATE" is the older spelling)
+    if "PATCH" not in exclude_methods and "UPDATE" not in exclude_methods:
         @bp.route(f"/{endpoint}/<doc_id>", methods=["PATCH"])
         def update(doc_id):
             doc, err, code = get_document_or_404(model, doc_id, f"{endpoint[:-1].capitalize()} not found")
@@ -156,7 +206,7 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
 
             # Ownership check
             if user_owned and hasattr(request, 'user_id'):
-                if hasattr(doc, 'user') and str(doc.user.id) != request.user_id:
+                if hasattr(doc, 'user') and str(ref_id(doc, 'user')) != request.user_id:
                     return jsonify({"error": "You do not have permission to update this"}), 403
 
             data = request.get_json() or {}
@@ -169,6 +219,7 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
             try:
                 data = resolve_references(data) 
                 update_doc = update_document_fields(doc, data)
+                response_cache.invalidate(doc.id)
                 return jsonify(update_doc.to_dict()), 200
             except Exception as e:
                 return jsonify({"error": str(e)}), 400
@@ -185,7 +236,12 @@ def crud_factory(bp: Blueprint, model, endpoint: str, required_fields=None, user
                 return permission_error("delete")
             
             doc_name = getattr(doc, "name", getattr(doc, "body", str(doc.id)))
+            if on_delete:
+                on_delete(doc)
             doc.delete()
+            response_cache.invalidate(doc.id)
+            if after_delete:
+                after_delete(doc)
 
             return jsonify({
                 "message": f"{endpoint[:-1].capitalize()} '{doc_name}' deleted successfully"
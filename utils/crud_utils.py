@@ -1,17 +1,150 @@
+import datetime
+
 from flask import jsonify, request
-from mongoengine import DoesNotExist
+from mongoengine import DoesNotExist, Q
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 
 
-def get_document_or_404(model, doc_id, not_found_msg="Not Found"):
-    doc = model.objects(id=doc_id).first()
+def get_document_or_404(model, doc_id, not_found_msg="Not Found", fields=None):
+    doc = project(model.objects(id=doc_id), model, fields).first()
     if not doc:
         return None, {"error": not_found_msg}, 404
     return doc, None, 200
 
 
+def parse_page_size():
+    """Read ?limit= (default DEFAULT_PAGE_SIZE, capped at MAX_PAGE_SIZE). Returns (limit, error, status)."""
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None, {"error": "limit must be an integer"}, 400
+    if limit <= 0:
+        return None, {"error": "limit must be greater than 0"}, 400
+    return min(limit, MAX_PAGE_SIZE), None, 200
+
+
+def paginate_queryset(queryset):
+    """
+    Keyset-paginate a queryset on _id using the ?limit= and ?after= query params.
+
+    Returns (page, error, status) where page is {"docs": [...], "next_cursor": str|None}.
+    next_cursor is the id of the last document on the page and is only set when
+    more documents follow it.
+    """
+    limit, err, code = parse_page_size()
+    if err:
+        return None, err, code
+
+    after = request.args.get("after")
+    if after:
+        if not ObjectId.is_valid(after):
+            return None, {"error": "Invalid cursor"}, 400
+        queryset = queryset.filter(id__gt=ObjectId(after))
+
+    # Fetch one extra document to know whether another page exists
+    docs = list(queryset.order_by("id").limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1].id)
+
+    return {"docs": docs, "next_cursor": next_cursor}, None, 200
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_MS = datetime.timedelta(milliseconds=1)
+
+
+def paginate_newest_first(queryset, time_field):
+    """
+    Keyset-paginate a queryset newest first on (time_field, _id) using ?limit= and ?after=.
+
+    The cursor is "<epoch ms>_<id>" of the last document on the page; _id breaks
+    ties between documents stored in the same millisecond. Returns (page, error,
+    status) like paginate_queryset.
+    """
+    limit, err, code = parse_page_size()
+    if err:
+        return None, err, code
+
+    after = request.args.get("after")
+    if after:
+        millis, _, last_id = after.partition("_")
+        if not millis.isdigit() or not ObjectId.is_valid(last_id):
+            return None, {"error": "Invalid cursor"}, 400
+        last_time = EPOCH + int(millis) * ONE_MS
+        queryset = queryset.filter(
+            Q(**{f"{time_field}__lt": last_time})
+            | Q(**{time_field: last_time, "id__lt": ObjectId(last_id)})
+        )
+
+    docs = list(queryset.order_by(f"-{time_field}", "-id").limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        # MongoDB keeps milliseconds, so this round-trips exactly for stored documents
+        next_cursor = f"{(getattr(last, time_field) - EPOCH) // ONE_MS}_{last.id}"
+
+    return {"docs": docs, "next_cursor": next_cursor}, None, 200
+
+
+def parse_fields(model):
+    """
+    Resolve ?fields=a,b or ?view=<name> into the set of to_dict() keys to return.
+
+    Only models that declare FIELD_SOURCES (and optionally VIEWS) support this.
+    Returns (fields, error, status); fields is None when the full document is wanted.
+    """
+    fields_arg = request.args.get("fields")
+    view = request.args.get("view")
+    if not fields_arg and (not view or view == "full"):
+        return None, None, 200
+
+    sources = getattr(model, "FIELD_SOURCES", None)
+    if sources is None:
+        return None, {"error": "Field selection is not supported for this resource"}, 400
+
+    if fields_arg:
+        fields = {field.strip() for field in fields_arg.split(",") if field.strip()}
+        unknown = fields - set(sources)
+        if unknown:
+            return None, {"error": f"Unknown fields: {', '.join(sorted(unknown))}"}, 400
+    else:
+        views = getattr(model, "VIEWS", {})
+        if view not in views:
+            return None, {"error": f"view must be one of: {', '.join(['full', *views])}"}, 400
+        fields = set(views[view])
+
+    fields.add("id")
+    return fields, None, 200
+
+
+def project(queryset, model, fields):
+    """Apply an .only() projection for the given to_dict() keys so unused fields never leave MongoDB."""
+    if fields is None:
+        return queryset
+    only = {model.FIELD_SOURCES[field] for field in fields}
+    # Ownership checks always need the owner reference
+    if "user" in model._fields:
+        only.add("user")
+    return queryset.only(*only)
+
 
 def update_document_fields(document, data, exclude_fields=None):
-    """Update document with provided data except excluded fields"""
+    """
+    Update document with provided data except excluded fields.
+
+    Raises ValueError if data sets any of the model's READ_ONLY_FIELDS
+    (denormalized or derived fields that only the server may change).
+    """
+    read_only = sorted(set(data) & set(getattr(document, "READ_ONLY_FIELDS", ())))
+    if read_only:
+        raise ValueError(f"Cannot set read-only field(s): {', '.join(read_only)}")
+
     exclude_fields = exclude_fields or {"id"}
     updatable_fields = set(document._fields.keys()) - set(exclude_fields)
 
@@ -20,4 +153,4 @@ def update_document_fields(document, data, exclude_fields=None):
             setattr(document, field, value)
 
     document.save()
-    return document 
\ No newline at end of file
+    return document 
@@ -0,0 +1,79 @@
+import os
+import threading
+
+import certifi
+from gridfs import GridFS
+from mongoengine import get_db, register_connection
+from pymongo import ReadPreference
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+# env var -> MongoClient option; unset variables keep pymongo's defaults
+POOL_SETTINGS = {
+    "MONGODB_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGODB_MIN_POOL_SIZE": "minPoolSize",
+    "MONGODB_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGODB_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGODB_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGODB_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGODB_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+}
+
+
+def mongo_settings():
+    """MongoClient options for the default connection, read from the environment."""
+    settings = {
+        option: int(os.environ[env_var])
+        for env_var, option in POOL_SETTINGS.items()
+        if os.getenv(env_var)
+    }
+
+    read_preference = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+    if read_preference not in READ_PREFERENCES:
+        raise ValueError(
+            f"MONGODB_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}, got {read_preference!r}"
+        )
+    settings["read_preference"] = READ_PREFERENCES[read_preference]
+    return settings
+
+
+def init_db(app):
+    """
+    Register the default MongoEngine connection without opening it.
+
+    MongoEngine creates the MongoClient on the first query, so with gunicorn
+    each worker builds its own client (and pool, and monitor threads) after
+    fork, and a slow Atlas handshake no longer holds up importing the app.
+
+    Registering still parses the URI, and for a mongodb+srv:// URI pymongo
+    resolves the SRV and TXT DNS records right here. That is a DNS lookup, not
+    a connection, but it does need the network: it fails when DNS is down.
+    """
+    register_connection(
+        alias="default",
+        host=os.getenv("MONGODB_URI"),
+        tls=True,
+        tlsCAFile=certifi.where(),
+        **mongo_settings()
+    )
+
+
+_fs = None
+_fs_pid = None
+_fs_lock = threading.Lock()
+
+
+def get_fs():
+    """Shared GridFS handle for the default database, created once per process."""
+    global _fs, _fs_pid
+    with _fs_lock:
+        if _fs is None or _fs_pid != os.getpid():
+            _fs = GridFS(get_db())
+            _fs_pid = os.getpid()
+        return _fs
@@ -0,0 +1,137 @@
+import datetime
+import logging
+import os
+import threading
+import time
+
+import pymongo
+from mongoengine import connection, get_db
+
+from utils.metrics import pool_listener
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "5"))
+# Not ready once the last successful ping is older than this
+STALE_AFTER = float(os.getenv("HEALTH_STALE_AFTER_SECONDS", str(3 * CHECK_INTERVAL)))
+
+
+def _isoformat(timestamp):
+    return datetime.datetime.utcfromtimestamp(timestamp).isoformat() + "Z" if timestamp else None
+
+
+class HealthMonitor:
+    """
+    Checks MongoDB and GridFS from a background thread every CHECK_INTERVAL seconds.
+
+    The health endpoints only read the last result, so a probe never waits on
+    the cluster; a slow or hung ping shows up as a stale last_success instead.
+    Like the notification queue, the thread starts on first use in each process.
+    """
+
+    def __init__(self, interval=CHECK_INTERVAL, timeout=CHECK_TIMEOUT, stale_after=STALE_AFTER):
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._worker_pid = None
+
+        self.checked_at = None
+        self.last_success = None
+        self.ping_ms = None
+        self.database_error = None
+        self.consecutive_failures = 0
+        self.gridfs_error = None
+        self.gridfs_ok = None
+        self.pool_max_size = None
+
+    def start(self):
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+        threading.Thread(target=self._run, name="health-monitor", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self.interval)
+
+    def check(self):
+        """Run one round of checks and record the results."""
+        database_error = gridfs_error = None
+        ping_ms = pool_max_size = None
+
+        try:
+            client = connection.get_connection(alias="default")
+            if isinstance(client, pymongo.MongoClient):
+                pool_max_size = client.options.pool_options.max_pool_size
+
+            # Bounds server selection as well as the command itself
+            with pymongo.timeout(self.timeout):
+                started = time.perf_counter()
+                client.admin.command("ping")
+                ping_ms = round((time.perf_counter() - started) * 1000, 1)
+        except Exception as e:
+            database_error = str(e)
+
+        if database_error is None:
+            try:
+                with pymongo.timeout(self.timeout):
+                    get_db()["fs.files"].find_one({}, projection={"_id": 1})
+            except Exception as e:
+                gridfs_error = str(e)
+
+        with self._lock:
+            self.checked_at = time.time()
+            self.ping_ms = ping_ms
+            self.pool_max_size = pool_max_size
+            self.database_error = database_error
+            self.gridfs_ok = database_error is None and gridfs_error is None
+            self.gridfs_error = gridfs_error or database_error
+            if database_error is None:
+                self.last_success = self.checked_at
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+
+        if database_error:
+            logger.warning("Health check failed (%d in a row): %s", self.consecutive_failures, database_error)
+
+    def is_ready(self):
+        last_success = self.last_success
+        return last_success is not None and time.time() - last_success <= self.stale_after
+
+    def state(self):
+        with self._lock:
+            if self.checked_at is None:
+                status = "starting"
+            elif not self.is_ready():
+                status = "error"
+            elif not self.gridfs_ok:
+                status = "degraded"
+            else:
+                status = "ok"
+
+            return {
+                "status": status,
+                "checked_at": _isoformat(self.checked_at),
+                "database": {
+                    "status": "connected" if self.checked_at and self.database_error is None else "unreachable",
+                    "ping_ms": self.ping_ms,
+                    "last_success": _isoformat(self.last_success),
+                    "consecutive_failures": self.consecutive_failures,
+                    "error": self.database_error,
+                },
+                "gridfs": {
+                    "status": "reachable" if self.gridfs_ok else "unreachable",
+                    "error": self.gridfs_error,
+                },
+                "pool": {**pool_listener.snapshot(), "max_size": self.pool_max_size},
+            }
+
+
+health_monitor = HealthMonitor()
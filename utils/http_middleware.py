@@ -0,0 +1,69 @@
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth the CPU (or the extra header bytes)
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_MIMETYPES = {"application/json"}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _choose_encoding():
+    if brotli is not None and request.accept_encodings["br"]:
+        return "br"
+    if request.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def conditional_and_compress(response):
+    """
+    after_request hook for JSON API responses.
+
+    GET/HEAD 200 responses get a weak ETag computed from the body and are turned
+    into 304 Not Modified when If-None-Match matches. Bodies of at least
+    COMPRESS_MIN_SIZE bytes are then brotli- or gzip-compressed, depending on
+    Accept-Encoding. Streams (images, SSE) are passed through untouched.
+    """
+    if (
+        response.mimetype not in COMPRESS_MIMETYPES
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.status_code != 200
+    ):
+        return response
+
+    if request.method in ("GET", "HEAD"):
+        response.add_etag(weak=True)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    response.vary.add("Accept-Encoding")
+    if "Content-Encoding" in response.headers or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_http_middleware(app):
+    app.after_request(conditional_and_compress)
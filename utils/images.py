@@ -0,0 +1,106 @@
+import io
+from PIL import Image, ImageOps, UnidentifiedImageError
+from flask import url_for
+
+# Widths (px) of the resized copies stored next to every uploaded image
+VARIANT_WIDTHS = (200, 600)
+THUMBNAIL_WIDTH = 600
+AVATAR_WIDTH = 200
+
+# content type -> Pillow format, in order of preference
+VARIANT_FORMATS = {
+    "image/webp": "WEBP",
+    "image/jpeg": "JPEG",
+}
+VARIANT_QUALITY = 80
+
+
+def image_url(image_id, width=None):
+    """External URL for a GridFS image; width selects a resized variant (?w=)."""
+    return url_for("images.serve_image", image_id=str(image_id), w=width, _external=True)
+
+
+def load_image(data):
+    """Decode uploaded bytes with Pillow, raising ValueError if they are not an image."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"Uploaded file is not a valid image: {e}")
+
+
+def render_variants(image):
+    """Resize and encode image for every VARIANT_WIDTHS x VARIANT_FORMATS; yields (width, content_type, bytes)."""
+    for width in VARIANT_WIDTHS:
+        if image.width <= width:
+            continue
+
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        has_alpha = resized.mode in ("RGBA", "LA", "P")
+
+        for content_type, image_format in VARIANT_FORMATS.items():
+            # JPEG has no alpha channel
+            mode = "RGBA" if has_alpha and image_format == "WEBP" else "RGB"
+            buffer = io.BytesIO()
+            resized.convert(mode).save(buffer, image_format, quality=VARIANT_QUALITY)
+            yield width, content_type, buffer.getvalue()
+
+
+def put_variant(fs, original_id, width, content_type, data, filename=None, **kwargs):
+    """Store one rendered variant; extra kwargs (e.g. _id) go to GridFS.put()."""
+    return fs.put(
+        data,
+        content_type=content_type,
+        filename=f"{width}w-{filename or original_id}",
+        variantOf=original_id,
+        width=width,
+        **kwargs
+    )
+
+
+def store_variants(fs, original_id, image, filename=None):
+    """
+    Store WebP and JPEG copies of image at each VARIANT_WIDTHS in GridFS.
+
+    Variants carry variantOf/width fields on their fs.files document so
+    find_variant() can look them up. Widths the original is already smaller
+    than are skipped; serve_image falls back to the original for those.
+    """
+    for width, content_type, data in render_variants(image):
+        put_variant(fs, original_id, width, content_type, data, filename)
+
+
+def pick_variant_width(requested):
+    """Smallest stored variant width that is at least the requested width, or None for the original."""
+    for width in VARIANT_WIDTHS:
+        if requested <= width:
+            return width
+    return None
+
+
+def find_variant(fs, original_id, width, accept_webp=True):
+    """Return the GridOut of the best stored variant, or None if there is none."""
+    content_types = [ct for ct in VARIANT_FORMATS if accept_webp or ct != "image/webp"]
+    for content_type in content_types:
+        variant = fs.find_one({"variantOf": original_id, "width": width, "contentType": content_type})
+        if variant:
+            return variant
+    return None
+
+
+def delete_variants(fs, original_id):
+    for variant in list(fs.find({"variantOf": original_id})):
+        fs.delete(variant._id)
+
+
+def delete_image(fs, file_id):
+    """Delete an uploaded image together with its resized variants."""
+    delete_variants(fs, file_id)
+    fs.delete(file_id)
+
+
+def ensure_variant_index(db):
+    """Index fs.files for find_variant(); GridFS files are not a MongoEngine model so this is not automatic."""
+    db["fs.files"].create_index([("variantOf", 1), ("width", 1), ("contentType", 1)])
@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Requests over either budget are logged as slow
+QUERY_BUDGET = int(os.getenv("REQUEST_QUERY_BUDGET", "25"))
+LATENCY_BUDGET_MS = float(os.getenv("REQUEST_LATENCY_BUDGET_MS", "500"))
+
+_local = threading.local()
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "db_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def current_stats():
+    """Stats of the request being handled on this thread, or None outside a request."""
+    return getattr(_local, "stats", None)
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Counts MongoDB commands and their time against the request on the current thread.
+
+    pymongo publishes command events on the thread that ran the command, so work
+    done by background threads (notification queue, health monitor) is not
+    attributed to any request.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        stats = current_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += event.duration_micros / 1_000_000
+
+
+@contextmanager
+def timed_serialization():
+    """Attribute the wrapped block to the request's serialization time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - started
+
+
+def _start_request():
+    _local.stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    db_ms = stats.db_seconds * 1000
+    serialize_ms = stats.serialize_seconds * 1000
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={db_ms:.1f};desc="{stats.queries} queries", '
+        f"serialize;dur={serialize_ms:.1f}, "
+        f"total;dur={total_ms:.1f}"
+    )
+
+    if stats.queries > QUERY_BUDGET or total_ms > LATENCY_BUDGET_MS:
+        logger.warning(
+            "Slow request %s %s -> %s: %.1f ms total, %d queries (%.1f ms in MongoDB), %.1f ms serializing",
+            request.method, request.full_path.rstrip("?"), response.status_code,
+            total_ms, stats.queries, db_ms, serialize_ms
+        )
+    return response
+
+
+def _clear_request(exc=None):
+    _local.stats = None
+
+
+def init_instrumentation(app):
+    """
+    Register the MongoDB command listener and the per-request timing hooks.
+
+    Must run before the MongoDB client is created: pymongo only attaches
+    globally registered listeners to clients constructed afterwards.
+    """
+    monitoring.register(CommandTimer())
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_clear_request)
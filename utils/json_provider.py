@@ -0,0 +1,69 @@
+import datetime
+import os
+
+from bson import ObjectId
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+
+from utils.instrumentation import timed_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# "orjson" (default when installed) or "stdlib"
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson")
+
+
+def _default(value):
+    """Types the API emits that JSON has no native form for."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """
+    Flask's json-module provider, rendering ObjectId as a string and datetimes
+    as ISO 8601 (the same output as OrjsonProvider) instead of HTTP dates.
+    """
+
+    sort_keys = False
+
+    def response(self, *args, **kwargs):
+        with timed_serialization():
+            return super().response(*args, **kwargs)
+
+    @staticmethod
+    def default(value):
+        try:
+            return _default(value)
+        except TypeError:
+            return DefaultJSONProvider.default(value)
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson-backed provider; serializes datetimes natively and skips the str round trip for responses."""
+
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with timed_serialization():
+            body = orjson.dumps(obj, default=_default, option=self.option)
+        return self._app.response_class(body, mimetype="application/json")
+
+
+def create_json_provider(app):
+    """Provider for app.json: orjson when available and selected, otherwise the stdlib fallback."""
+    if orjson is not None and JSON_BACKEND == "orjson":
+        return OrjsonProvider(app)
+    return StdlibJSONProvider(app)
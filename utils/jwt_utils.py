@@ -1,7 +1,62 @@
+import datetime
+
 import jwt
 from functools import wraps
 from flask import request, jsonify, current_app
-from models.blacklist import BlackList
+from utils.revocation import revocation_cache
+
+
+def decode_token(token, scope=None):
+    """
+    Validate a token and return (claims, error message).
+
+    Session tokens from /signin carry no scope. Scoped tokens (see
+    create_scoped_token) are only accepted where that scope is asked for,
+    so one can never stand in for a session token.
+    """
+    try:
+        decoded = jwt.decode(
+            token,
+            current_app.config["SECRET_KEY"],
+            algorithms=["HS256"]
+        )
+    except jwt.ExpiredSignatureError:
+        return None, "Token has expired!"
+    except jwt.InvalidTokenError:
+        return None, "Invalid token!"
+
+    jti = decoded.get("jti")
+    if not jti or "user_id" not in decoded:
+        return None, "Invalid token structure"
+    if decoded.get("scope") != scope:
+        return None, "Invalid token!"
+
+    # ✅ Check if token jti is blacklisted (local cache, synced from BlackList)
+    if revocation_cache.is_revoked(jti):
+        return None, "Token has been blacklisted, please signin again"
+
+    return decoded, None
+
+
+def create_scoped_token(session, scope, lifetime):
+    """
+    Short-lived token limited to one scope, issued from a validated session token's claims.
+
+    It shares the session's jti, so signing out revokes it too, and never
+    outlives the session ("session_exp").
+    """
+    session_exp = session.get("exp")
+    expires = datetime.datetime.now(datetime.timezone.utc) + lifetime
+    if session_exp is not None:
+        expires = min(expires, datetime.datetime.fromtimestamp(session_exp, datetime.timezone.utc))
+    return jwt.encode({
+        "user_id": session["user_id"],
+        "jti": session["jti"],
+        "scope": scope,
+        "exp": expires,
+        "session_exp": session_exp,
+    }, current_app.config["SECRET_KEY"], algorithm="HS256")
+
 
 def token_required(f):
     @wraps(f)
@@ -17,30 +72,15 @@ def token_required(f):
         if not token:
             return jsonify({"error": "Missing token!"}), 401
 
-        try:
-            decoded = jwt.decode(
-                token,
-                current_app.config["SECRET_KEY"],
-                algorithms=["HS256"]
-            )
-
-            jti = decoded.get("jti")
-            if not jti:
-                return jsonify({"error": "Invalid token structure"}), 401
-
-            # ✅ Check if token jti is blacklisted
-            if BlackList.objects(jti=jti).first():
-                return jsonify({"error": "Token has been blacklisted, please signin again"}), 401
-
-            # attach decoded info
-            request.user_id = decoded["user_id"]
-            request.token = token
-            request.jti = jti
-
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token has expired!"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token!"}), 401
+        decoded, error = decode_token(token)
+        if error:
+            return jsonify({"error": error}), 401
+
+        # attach decoded info
+        request.user_id = decoded["user_id"]
+        request.token = token
+        request.jti = decoded["jti"]
+        request.token_claims = decoded
 
         return f(*args, **kwargs)
     return decorated
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+from pymongo import monitoring
+
+# With gunicorn, point PROMETHEUS_MULTIPROC_DIR at an empty directory shared by all
+# workers; each worker then writes its samples to mmap'd files there and /metrics
+# aggregates them, so counts are per deployment rather than per worker.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "recipehub_http_requests_total", "HTTP requests handled",
+    ["method", "blueprint", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "recipehub_http_request_duration_seconds", "Time spent handling HTTP requests",
+    ["method", "blueprint", "route"], buckets=LATENCY_BUCKETS
+)
+
+MONGO_POOL_OPEN = Gauge(
+    "recipehub_mongodb_pool_open_connections", "Open connections in the MongoDB pools",
+    multiprocess_mode="livesum"
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "recipehub_mongodb_pool_checked_out_connections", "MongoDB connections currently in use",
+    multiprocess_mode="livesum"
+)
+
+GRIDFS_BYTES_SERVED = Counter("recipehub_gridfs_bytes_served_total", "Image bytes streamed from GridFS")
+
+CACHE_REQUESTS = Counter(
+    "recipehub_cache_requests_total", "Cache lookups by cache and outcome (hit/miss)",
+    ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter("recipehub_cache_evictions_total", "Cache entries evicted for space", ["cache"])
+RESPONSE_CACHE_REQUESTS = Counter(
+    "recipehub_response_cache_requests_total", "Cached endpoint lookups by endpoint and outcome (hit/miss)",
+    ["endpoint", "result"]
+)
+RESPONSE_CACHE_INVALIDATIONS = Counter(
+    "recipehub_response_cache_invalidations_total", "Document ids invalidated in the response cache"
+)
+
+NOTIFICATION_QUEUE_DEPTH = Gauge(
+    "recipehub_notification_queue_depth", "Notification operations waiting to be written",
+    multiprocess_mode="livesum"
+)
+NOTIFICATION_QUEUE_LAG = Gauge(
+    "recipehub_notification_queue_flush_lag_seconds", "Age of the oldest operation at the last flush",
+    multiprocess_mode="livemax"
+)
+NOTIFICATION_QUEUE_OPS = Counter(
+    "recipehub_notification_queue_operations_total", "Notification operations by outcome",
+    ["outcome"]
+)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Keeps the MongoDB pool gauges in step with pymongo's connection pool events.
+
+    Also keeps this process's own counts, which the health monitor reports.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+
+    def _count(self, attr, delta):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + delta)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "checkout_failures": self.checkout_failures,
+            }
+
+    def connection_created(self, event):
+        MONGO_POOL_OPEN.inc()
+        self._count("open", 1)
+
+    def connection_closed(self, event):
+        MONGO_POOL_OPEN.dec()
+        self._count("open", -1)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc()
+        self._count("checked_out", 1)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+        self._count("checked_out", -1)
+
+    def connection_check_out_failed(self, event):
+        self._count("checkout_failures", 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+pool_listener = PoolMetricsListener()
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+
+    # Label by route template, not path, to keep label cardinality bounded
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    blueprint = request.blueprint or "app"
+    HTTP_LATENCY.labels(request.method, blueprint, route).observe(time.perf_counter() - started)
+    HTTP_REQUESTS.labels(request.method, blueprint, route, str(response.status_code)).inc()
+    return response
+
+
+def metrics_response():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Register request metrics and GET /metrics. Like init_instrumentation, call before connect()."""
+    monitoring.register(pool_listener)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule("/metrics", "metrics", metrics_response, methods=["GET"])
@@ -0,0 +1,107 @@
+import importlib
+import os
+import pkgutil
+import re
+import time
+
+from pymongo import UpdateOne
+
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+# Pause between batches so a migration on the live cluster leaves room for real traffic
+MIGRATION_PAUSE_MS = int(os.getenv("MIGRATION_PAUSE_MS", "100"))
+
+MIGRATION_NAME = re.compile(r"^\d{4}_\w+$")
+
+
+def discover():
+    """(name, module) for every migrations/NNNN_*.py, in version order."""
+    import migrations
+
+    names = sorted(
+        name for _, name, is_package in pkgutil.iter_modules(migrations.__path__)
+        if not is_package and MIGRATION_NAME.match(name)
+    )
+    return [(name, importlib.import_module(f"migrations.{name}")) for name in names]
+
+
+def _collection(target):
+    # Accept a Document class as well as a pymongo collection
+    return target._get_collection() if hasattr(target, "_get_collection") else target
+
+
+class MigrationContext:
+    """
+    Passed to each migration's up(). Walks the matching documents in _id order,
+    batch_size at a time, pausing between batches and reporting progress.
+
+    Prefer update_many(): each batch is a single server-side update, with a
+    pipeline when the new value is computed from other fields. bulk_update()
+    is the fallback for values only Python can compute.
+    """
+
+    def __init__(self, name, batch_size=MIGRATION_BATCH_SIZE, pause_ms=MIGRATION_PAUSE_MS, echo=print):
+        self.name = name
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+        self.echo = echo
+
+    def update_many(self, target, query, update):
+        """Apply update (an update document or an aggregation pipeline) to every document matching query."""
+        collection = _collection(target)
+
+        def apply(docs):
+            # Re-check query so documents changed since the _id scan are not touched by mistake
+            result = collection.update_many({"$and": [query, {"_id": {"$in": [doc["_id"] for doc in docs]}}]}, update)
+            return result.modified_count
+
+        return self._run(collection, query, {"_id": 1}, apply)
+
+    def bulk_update(self, target, query, projection, make_update):
+        """
+        Call make_update(doc) for every matching document (fetched with projection)
+        and write the returned update documents with one unordered bulk_write per batch.
+        make_update may return None to leave a document alone.
+        """
+        collection = _collection(target)
+
+        def apply(docs):
+            operations = []
+            for doc in docs:
+                update = make_update(doc)
+                if update:
+                    operations.append(UpdateOne({"_id": doc["_id"]}, update))
+            if not operations:
+                return 0
+            return collection.bulk_write(operations, ordered=False).modified_count
+
+        return self._run(collection, query, {**projection, "_id": 1}, apply)
+
+    def _run(self, collection, query, projection, apply):
+        total = collection.count_documents(query)
+        if not total:
+            self.echo(f"{self.name}: nothing to do in {collection.name}")
+            return 0
+
+        started = time.monotonic()
+        seen = modified = 0
+        last_id = None
+        while True:
+            batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+            docs = list(collection.find(batch_query, projection).sort("_id", 1).limit(self.batch_size))
+            if not docs:
+                break
+
+            modified += apply(docs)
+            seen += len(docs)
+            last_id = docs[-1]["_id"]
+
+            elapsed = time.monotonic() - started
+            self.echo(
+                f"{self.name}: {collection.name} {seen}/{total} ({min(100, seen * 100 // total)}%), "
+                f"{modified} modified, {seen / elapsed if elapsed else 0:.0f} docs/s"
+            )
+            if len(docs) < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+        return modified
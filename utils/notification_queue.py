@@ -0,0 +1,281 @@
+import atexit
+import functools
+import logging
+import operator
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from mongoengine import Q
+from pymongo.errors import BulkWriteError
+
+from models.notification import Notification
+from utils.notification_stream import publish_notification
+from utils.metrics import NOTIFICATION_QUEUE_DEPTH, NOTIFICATION_QUEUE_LAG, NOTIFICATION_QUEUE_OPS
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW = float(os.getenv("NOTIFICATION_BATCH_WINDOW_SECONDS", "0.5"))
+MAX_BATCH = int(os.getenv("NOTIFICATION_MAX_BATCH", "500"))
+# Writes that fail are retried with exponential backoff, up to this many attempts in all
+MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+MAX_RETRY_DELAY = 30.0  # seconds
+
+
+class _Pending:
+    """Net effect of the operations queued for one key: an optional delete followed by an optional create."""
+
+    __slots__ = ("delete_filter", "create", "enqueued_at", "attempts", "retry_at")
+
+    def __init__(self):
+        self.delete_filter = None
+        self.create = None  # (notification, actor)
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.retry_at = None  # set while a failed write waits for its next attempt
+
+    def op_count(self):
+        return (self.delete_filter is not None) + (self.create is not None)
+
+
+class NotificationQueue:
+    """
+    Writes notifications from a background thread instead of inside the request.
+
+    Operations are keyed, e.g. ("favorite", recipient, actor, recipe), and held
+    for up to BATCH_WINDOW seconds. A create followed by a delete for the same
+    key within the window cancels out without touching the database. Each flush
+    runs one delete_many for all pending deletes and one insert_many for all
+    pending creates, then publishes the new notifications to live streams.
+
+    Operations whose write fails go back on the queue and are retried with
+    exponential backoff, up to max_attempts; only then are they dropped and
+    counted as failed. Notification ids are assigned at enqueue time, so a
+    retried insert that already landed is recognized as a duplicate key.
+
+    The worker thread starts on first use in each process, so it is created
+    after gunicorn forks.
+    """
+
+    def __init__(self, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH, max_attempts=MAX_ATTEMPTS):
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker_pid = None
+
+        self.inserted = 0
+        self.deleted = 0
+        self.cancelled = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_flush_lag = 0.0
+
+    # --- producer side (request threads) ---
+
+    def enqueue_create(self, key, notification, actor=None):
+        notification.validate()
+        if notification.id is None:
+            notification.id = ObjectId()
+
+        with self._cond:
+            self._pending_for(key).create = (notification, actor)
+            NOTIFICATION_QUEUE_DEPTH.set(len(self._pending))
+            self._cond.notify()
+        self._ensure_worker()
+
+    def enqueue_delete(self, key, **filters):
+        with self._cond:
+            entry = self._pending_for(key)
+            if entry.create:
+                # The notification was never written, so there is nothing to delete
+                entry.create = None
+                self.cancelled += 1
+                NOTIFICATION_QUEUE_OPS.labels("cancelled").inc()
+                if entry.delete_filter is None:
+                    del self._pending[key]
+            else:
+                entry.delete_filter = filters
+            NOTIFICATION_QUEUE_DEPTH.set(len(self._pending))
+            self._cond.notify()
+        self._ensure_worker()
+
+    def _pending_for(self, key):
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = _Pending()
+        return entry
+
+    # --- consumer side ---
+
+    def _ensure_worker(self):
+        with self._cond:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+        threading.Thread(target=self._run, name="notification-queue", daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                # Let the batch fill up (and like/unlike pairs cancel) until the oldest op is BATCH_WINDOW
+                # old; operations waiting to be retried only count once their backoff is over
+                while self._pending and self._ready_count() < self.max_batch:
+                    remaining = self._next_due() - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            self.flush()
+
+    def _due_at(self, entry):
+        return entry.retry_at if entry.retry_at is not None else entry.enqueued_at + self.batch_window
+
+    def _next_due(self):
+        return min(self._due_at(entry) for entry in self._pending.values())
+
+    def _ready_count(self):
+        now = time.monotonic()
+        return sum(1 for entry in self._pending.values() if entry.retry_at is None or entry.retry_at <= now)
+
+    def flush(self, include_retries=False):
+        """
+        Write everything pending now, except operations still backing off after
+        a failure unless include_retries. Called by the worker, and at exit
+        (with include_retries) so queued notifications are not lost.
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._cond:
+                batch = OrderedDict(
+                    (key, entry) for key, entry in self._pending.items()
+                    if include_retries or entry.retry_at is None or entry.retry_at <= now
+                )
+                for key in batch:
+                    del self._pending[key]
+                NOTIFICATION_QUEUE_DEPTH.set(len(self._pending))
+            if not batch:
+                return
+
+            self.last_flush_lag = now - min(entry.enqueued_at for entry in batch.values())
+            NOTIFICATION_QUEUE_LAG.set(self.last_flush_lag)
+
+            failed = self._delete(batch)
+            written, failed_creates = self._insert(
+                [(key, entry) for key, entry in batch.items() if entry.create is not None and key not in failed]
+            )
+            for key, entry in failed_creates:
+                # Only the insert is retried: any delete for this key already went through
+                entry.delete_filter = None
+                failed[key] = entry
+            self._requeue(failed)
+
+            for notification, actor in written:
+                publish_notification(notification, actor=actor)
+
+    def _delete(self, batch):
+        """Run every pending delete as one delete_many. Returns {key: entry} to retry."""
+        deletes = {key: entry for key, entry in batch.items() if entry.delete_filter is not None}
+        if not deletes:
+            return {}
+
+        try:
+            query = functools.reduce(operator.or_, (Q(**entry.delete_filter) for entry in deletes.values()))
+            deleted = Notification.objects(query).delete()
+        except Exception:
+            logger.exception("Failed to delete %d queued notifications", len(deletes))
+            # A create queued behind a failed delete waits with it, or the retried delete would remove it
+            return deletes
+
+        self.deleted += deleted
+        NOTIFICATION_QUEUE_OPS.labels("deleted").inc(deleted)
+        return {}
+
+    def _insert(self, creates):
+        """Insert every pending create with one unordered insert_many. Returns (written, failed)."""
+        if not creates:
+            return [], []
+
+        try:
+            Notification._get_collection().insert_many(
+                [entry.create[0].to_mongo() for _, entry in creates],
+                ordered=False
+            )
+            failed_indexes = set()
+        except BulkWriteError as e:
+            # A duplicate _id means an earlier attempt wrote it after all
+            failed_indexes = {error["index"] for error in e.details["writeErrors"] if error.get("code") != 11000}
+            if failed_indexes:
+                logger.warning("Failed to insert %d of %d queued notifications", len(failed_indexes), len(creates))
+        except Exception:
+            logger.exception("Failed to insert %d queued notifications", len(creates))
+            failed_indexes = set(range(len(creates)))
+
+        written = [entry.create for i, (_, entry) in enumerate(creates) if i not in failed_indexes]
+        failed = [(key, entry) for i, (key, entry) in enumerate(creates) if i in failed_indexes]
+        self.inserted += len(written)
+        NOTIFICATION_QUEUE_OPS.labels("inserted").inc(len(written))
+        return written, failed
+
+    def _requeue(self, failed):
+        """Put failed operations back with a backoff, or drop them once they are out of attempts."""
+        if not failed:
+            return
+
+        now = time.monotonic()
+        with self._cond:
+            for key, entry in failed.items():
+                ops = entry.op_count()
+                entry.attempts += 1
+                if entry.attempts >= self.max_attempts:
+                    self.failed += ops
+                    NOTIFICATION_QUEUE_OPS.labels("failed").inc(ops)
+                    logger.error("Dropping notification operations for %s after %d attempts", key, entry.attempts)
+                    continue
+
+                newer = self._pending.get(key)
+                if newer is not None:
+                    # Queued for the same key since this batch was taken, so it supersedes the failed
+                    # create; a failed delete still has to run before it
+                    if entry.create is not None:
+                        self.cancelled += 1
+                        NOTIFICATION_QUEUE_OPS.labels("cancelled").inc()
+                    if newer.delete_filter is None and entry.delete_filter is not None:
+                        newer.delete_filter = entry.delete_filter
+                        self.retried += 1
+                        NOTIFICATION_QUEUE_OPS.labels("retried").inc()
+                    continue
+
+                entry.retry_at = now + min(self.batch_window * 2 ** entry.attempts, MAX_RETRY_DELAY)
+                self._pending[key] = entry
+                self.retried += ops
+                NOTIFICATION_QUEUE_OPS.labels("retried").inc(ops)
+
+            NOTIFICATION_QUEUE_DEPTH.set(len(self._pending))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._pending)
+            oldest = min((entry.enqueued_at for entry in self._pending.values()), default=None)
+        return {
+            "depth": depth,
+            "lag_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "last_flush_lag_seconds": round(self.last_flush_lag, 3),
+            "inserted": self.inserted,
+            "deleted": self.deleted,
+            "cancelled": self.cancelled,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+notification_queue = NotificationQueue()
+atexit.register(notification_queue.flush, include_retries=True)
@@ -0,0 +1,28 @@
+import os
+
+from models.notification import Notification
+from utils.pubsub import LocalBackend, ChangeStreamBackend
+from utils.refs import ref_id
+
+# "local" delivers within one worker; "changestream" lets every worker see every insert
+PUBSUB_BACKEND = os.getenv("NOTIFICATION_PUBSUB_BACKEND", "local")
+
+
+def _create_backend():
+    if PUBSUB_BACKEND == "changestream":
+        return ChangeStreamBackend(
+            get_collection=Notification._get_collection,
+            to_channel=lambda document: str(document["user"]),
+            to_message=lambda document: Notification._from_son(document).to_dict(),
+        )
+    return LocalBackend()
+
+
+# Channels are recipient user ids; messages are Notification.to_dict() payloads
+notification_pubsub = _create_backend()
+
+
+def publish_notification(notification, actor=None):
+    """Push a freshly saved notification to its recipient's open streams."""
+    usernames = {actor.id: actor.username} if actor else None
+    notification_pubsub.publish(str(ref_id(notification, "user")), notification.to_dict(usernames=usernames))
@@ -0,0 +1,95 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class LocalBackend:
+    """
+    In-process pub/sub: publish() hands a message to every subscriber of a channel
+    in this worker. Enough for a single process; with several gunicorn workers a
+    subscriber only sees messages published by its own worker.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # channel -> set of queues
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A stalled client must not block publishers; it can refetch on reconnect
+                logger.warning("Dropping message for slow subscriber on %s", channel)
+
+    def subscribe(self, channel):
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+
+class ChangeStreamBackend(LocalBackend):
+    """
+    Feeds local subscribers from a MongoDB change stream instead of from publish().
+
+    Every insert into the watched collection, made by any worker or process, is
+    turned into a message by `to_message(document)` and delivered on
+    `to_channel(document)`. The watcher thread starts on the first subscribe
+    in each worker process. Change streams need a replica set (Atlas has one).
+    """
+
+    def __init__(self, get_collection, to_channel, to_message):
+        super().__init__()
+        self._get_collection = get_collection
+        self._to_channel = to_channel
+        self._to_message = to_message
+        self._watcher_pid = None
+
+    def publish(self, channel, message):
+        # The insert itself reaches subscribers through the change stream
+        pass
+
+    def subscribe(self, channel):
+        self._ensure_watcher()
+        return super().subscribe(channel)
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="pubsub-change-stream", daemon=True).start()
+
+    def _watch(self):
+        resume_token = None
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        while True:
+            try:
+                with self._get_collection().watch(pipeline, resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        document = change["fullDocument"]
+                        self._deliver(self._to_channel(document), self._to_message(document))
+            except Exception as e:
+                logger.warning("Change stream interrupted, retrying: %s", e)
+                time.sleep(1)
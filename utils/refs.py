@@ -0,0 +1,17 @@
+def ref_id(doc, field):
+    """
+    Return the ObjectId held by a ReferenceField without dereferencing it.
+
+    Reading doc.<field> makes MongoEngine fetch the referenced document; the raw
+    value in doc._data is a DBRef (or Document/ObjectId) that already carries the id.
+    """
+    value = doc._data.get(field)
+    if value is None:
+        return None
+    return getattr(value, "id", value)
+
+
+def ref_ids(doc, field):
+    """Same as ref_id() for a ListField(ReferenceField)."""
+    values = doc._data.get(field) or []
+    return [getattr(value, "id", value) for value in values]
@@ -0,0 +1,205 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, request
+
+from utils.cache import TTLCache
+from utils.metrics import RESPONSE_CACHE_REQUESTS, RESPONSE_CACHE_INVALIDATIONS
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "1024"))
+# e.g. redis://localhost:6379/0 to share entries and invalidations between workers
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+
+
+class LocalBackend:
+    """
+    Per-process backend: entries in a TTLCache, tag versions in a dict.
+
+    Invalidations only reach this worker, so other workers may serve an
+    entry for up to the TTL after a write, as with popular_cache.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        # Lookups are counted per endpoint by ResponseCache; only evictions are reported from here
+        self._entries = TTLCache(ttl=ttl, maxsize=maxsize, name="responses", count_requests=False)
+        self._versions = {}  # tag -> (version, expires_at)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry):
+        self._entries.set(key, entry)
+
+    def versions(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            return {tag: self._live_version(tag, now) for tag in tags}
+
+    def _live_version(self, tag, now):
+        version = self._versions.get(tag)
+        return version[0] if version and version[1] > now else None
+
+    def bump(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                # A version only has to outlive the entries stored before it, which expire within ttl
+                self._versions[tag] = (next(self._counter), now + self.ttl)
+            if len(self._versions) > 2 * RESPONSE_CACHE_MAXSIZE:
+                self._versions = {tag: v for tag, v in self._versions.items() if v[1] > now}
+
+
+class RedisBackend:
+    """Shared backend: every worker sees the same entries and invalidations."""
+
+    PREFIX = "recipehub:response-cache:"
+
+    def __init__(self, url, ttl):
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._redis.get(f"{self.PREFIX}entry:{key}")
+        return json.loads(raw) if raw else None
+
+    def set(self, key, entry):
+        self._redis.set(f"{self.PREFIX}entry:{key}", json.dumps(entry), ex=max(1, round(self.ttl)))
+
+    def versions(self, tags):
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = self._redis.mget([f"{self.PREFIX}tag:{tag}" for tag in tags])
+        return {tag: int(value) if value else None for tag, value in zip(tags, values)}
+
+    def bump(self, tags):
+        pipe = self._redis.pipeline()
+        for tag in tags:
+            pipe.incr(f"{self.PREFIX}tag:{tag}")
+            pipe.expire(f"{self.PREFIX}tag:{tag}", max(1, round(self.ttl)) + 1)
+        pipe.execute()
+
+
+def cache_tag(*doc_ids):
+    """Tag the response being cached with more document ids, for tags only known inside the handler."""
+    tags = g.get("response_cache_tags")
+    if tags is not None:
+        tags.update(str(doc_id) for doc_id in doc_ids)
+
+
+class ResponseCache:
+    """
+    Caches successful JSON GET responses of read-heavy endpoints.
+
+    Every entry is tagged with the ids of the documents it was rendered from
+    and remembers their tag versions; invalidate(doc_id) bumps the version, so
+    any entry built from that document stops matching on its next lookup.
+    Errors talking to a shared backend are logged and treated as misses.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def cached(self, name, tags=None, vary_user=False):
+        """
+        Decorate a view.
+
+        tags: optional callable receiving the view's keyword arguments and
+            returning the document ids the response depends on
+        vary_user: keep one entry per signed-in user (for per-user fields such as is_owner)
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != "GET":
+                    return view(*args, **kwargs)
+
+                key = f"{name}:{request.full_path}"
+                if vary_user:
+                    key += f":{getattr(request, 'user_id', '')}"
+
+                cached_response = self._lookup(key)
+                if cached_response is not None:
+                    RESPONSE_CACHE_REQUESTS.labels(name, "hit").inc()
+                    return cached_response
+                RESPONSE_CACHE_REQUESTS.labels(name, "miss").inc()
+
+                # Read the versions before rendering, so an invalidation that lands
+                # while the view runs makes the stored entry stale, not current
+                g.response_cache_tags = {str(tag) for tag in tags(**kwargs)} if tags else set()
+                versions = self._versions(g.response_cache_tags)
+
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and response.mimetype == "application/json" and not response.is_streamed:
+                    late_tags = g.response_cache_tags - versions.keys()
+                    versions.update(self._versions(late_tags))
+                    self._store(key, {
+                        "body": response.get_data(as_text=True),
+                        "versions": versions,
+                    })
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *doc_ids):
+        """Drop every cached response tagged with any of these document ids."""
+        tags = [str(doc_id) for doc_id in doc_ids if doc_id is not None]
+        if not tags:
+            return
+        RESPONSE_CACHE_INVALIDATIONS.inc(len(tags))
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            logger.warning("Response cache invalidation failed for %s: %s", tags, e)
+
+    def _versions(self, tags):
+        if not tags:
+            return {}
+        try:
+            return self.backend.versions(tags)
+        except Exception as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return {}
+
+    def _lookup(self, key):
+        try:
+            entry = self.backend.get(key)
+            if entry is None or self.backend.versions(entry["versions"]) != entry["versions"]:
+                return None
+        except Exception as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return None
+        return Response(entry["body"], status=200, mimetype="application/json")
+
+    def _store(self, key, entry):
+        try:
+            self.backend.set(key, entry)
+        except Exception as e:
+            logger.warning("Response cache unavailable: %s", e)
+
+
+def _create_backend():
+    if RESPONSE_CACHE_URL:
+        if redis is not None:
+            return RedisBackend(RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL)
+        logger.warning("RESPONSE_CACHE_URL is set but the redis package is not installed; caching per worker")
+    return LocalBackend(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAXSIZE)
+
+
+response_cache = ResponseCache(_create_backend())
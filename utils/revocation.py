@@ -0,0 +1,67 @@
+import datetime
+import os
+import threading
+import time
+
+from models.blacklist import BlackList, TOKEN_LIFETIME
+from utils.metrics import CACHE_REQUESTS
+
+REFRESH_INTERVAL = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+# Re-read a little before the last sync point so entries written by a worker whose
+# clock lags ours are not skipped
+CLOCK_SKEW = datetime.timedelta(seconds=30)
+
+
+class RevocationCache:
+    """
+    Per-process set of revoked JTIs, synced incrementally from the BlackList collection.
+
+    token_required checks this set instead of querying BlackList on every request.
+    Revocations made by this worker are visible immediately through add(); those
+    made by other workers become visible within REFRESH_INTERVAL seconds. Only
+    entries younger than TOKEN_LIFETIME are kept, since older tokens are rejected
+    as expired anyway, which keeps the set bounded.
+    """
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._revoked = {}  # jti -> blacklisted_on
+        self._synced_until = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Pull new BlackList entries if the refresh interval has passed. Returns True if it queried MongoDB."""
+        if time.monotonic() < self._next_refresh:
+            return False
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if time.monotonic() < self._next_refresh:
+                return False
+
+            now = datetime.datetime.utcnow()
+            cutoff = now - TOKEN_LIFETIME
+            since = self._synced_until - CLOCK_SKEW if self._synced_until else cutoff
+
+            revoked = {jti: on for jti, on in self._revoked.items() if on >= cutoff}
+            for entry in BlackList.objects(blacklisted_on__gte=since).only("jti", "blacklisted_on"):
+                revoked[entry.jti] = entry.blacklisted_on
+
+            self._revoked = revoked
+            self._synced_until = now
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            return True
+
+    def is_revoked(self, jti):
+        # "hit" means the check was answered without a database round trip
+        refreshed = self._refresh()
+        CACHE_REQUESTS.labels("jwt_revocation", "miss" if refreshed else "hit").inc()
+        return jti in self._revoked
+
+    def add(self, jti):
+        with self._lock:
+            self._revoked[jti] = datetime.datetime.utcnow()
+
+
+revocation_cache = RevocationCache()
@@ -0,0 +1,38 @@
+import re
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Quantities, units and preparation words that say nothing about what an ingredient is.
+# Words shorter than three letters (g, ml, oz, of, ...) are dropped anyway.
+STOPWORDS = frozenset({
+    "and", "for", "the", "with", "into", "plus", "optional", "taste", "about",
+    "cup", "tbsp", "tsp", "tablespoon", "teaspoon", "gram", "kilogram", "litre", "liter",
+    "ounce", "pound", "lbs", "pinch", "dash", "handful", "clove", "slice", "piece",
+    "can", "tin", "jar", "packet", "bunch", "sprig", "stick",
+    "large", "small", "medium", "big", "fresh", "dried", "frozen", "whole",
+    "chopped", "diced", "minced", "sliced", "grated", "ground", "crushed", "peeled",
+    "finely", "roughly", "thinly", "divided", "softened", "melted", "cooked", "raw",
+})
+
+
+def normalize_term(word):
+    """Lowercase and crudely singularize a word so 'Tomatoes' and 'tomato' match."""
+    word = word.lower()
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def ingredient_terms(ingredients):
+    """Sorted, de-duplicated ingredient keywords for Recipe.ingredientTerms."""
+    terms = set()
+    for ingredient in ingredients or []:
+        for word in _WORD_RE.findall(ingredient.lower()):
+            term = normalize_term(word)
+            if len(term) >= 3 and term not in STOPWORDS:
+                terms.add(term)
+    return sorted(terms)
@@ -0,0 +1,47 @@
+from models.user import User
+from models.comment import Comment
+from models.notification import Notification
+from utils.refs import ref_id
+
+
+def load_usernames(user_ids):
+    """Fetch {user_id: username} for all given ids with a single $in query."""
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    return {user.id: user.username for user in User.objects(id__in=list(ids)).only("username")}
+
+
+def serialize_recipes(recipes, fields=None):
+    # Recipe.to_dict() only renders reference ids, so there is nothing to prefetch
+    return [recipe.to_dict(fields=fields) for recipe in recipes]
+
+
+def serialize_comments(comments):
+    comments = list(comments)
+    usernames = load_usernames(ref_id(comment, "user") for comment in comments)
+    return [comment.to_dict(usernames=usernames) for comment in comments]
+
+
+def serialize_notifications(notifications):
+    notifications = list(notifications)
+    usernames = load_usernames(ref_id(notification, "actor") for notification in notifications)
+    return [notification.to_dict(usernames=usernames) for notification in notifications]
+
+
+_SERIALIZERS = {
+    Comment: serialize_comments,
+    Notification: serialize_notifications,
+}
+
+
+def serialize_many(model, docs, fields=None):
+    """Serialize a page of documents with one query per referenced model instead of one per document."""
+    if fields is not None:
+        # Only models with FIELD_SOURCES accept fields (see crud_utils.parse_fields)
+        return [doc.to_dict(fields=fields) for doc in docs]
+
+    serializer = _SERIALIZERS.get(model)
+    if serializer:
+        return serializer(docs)
+    return [doc.to_dict() for doc in docs]